@@ -1,10 +1,15 @@
+from bisect import bisect_left, bisect_right
 from enum import Enum, auto
+import numpy as np
 
 """
 Binary search algorithm
 
 Given an array of floats and a value, the index in the array corresponding to the nearest value is returned.
 The array should be in increasing order.
+
+Time ranges are looked up as slice bounds (interval_to_slice, or intervals_to_slices for many intervals at once), so
+that the columns of a DataStore can be sliced as views instead of copied index by index.
 """
 
 
@@ -15,57 +20,80 @@ class Rounding(Enum):
     NEAR = auto()
 
 
-def b_search(array: list[float], value: float, rounding: Rounding = Rounding.NEAR) -> int:
-    lo = 0
-    hi = len(array) - 1
-    while lo < hi:
-        m = int((lo + hi) / 2)
-        if array[m] < value:
-            lo = m
-        elif array[m] > value:
-            hi = m
-        elif array[m] == value:
-            return m
-        if hi - lo <= 1:
-            if rounding is Rounding.NEAR:
-                return lo if value - array[lo] < array[hi] - value else hi
-            elif rounding is Rounding.UP:
-                return hi
-            elif rounding is Rounding.DOWN:
-                return lo
-
-
-def interval_to_range(data: list[float], low_value: float, hi_value: float) -> range:
-    if (lo := b_search(data, low_value, Rounding.DOWN)) is not None:
-        if (hi := b_search(data, hi_value, Rounding.UP)) is not None:
-            return range(lo, hi + 1)
+def b_search(array, value: float, rounding: Rounding = Rounding.NEAR) -> int:
+    if (n := len(array)) == 0:
+        return None
+    if rounding is Rounding.UP:
+        return min(bisect_left(array, value), n - 1)
+    elif rounding is Rounding.DOWN:
+        return max(bisect_right(array, value) - 1, 0)
+    elif rounding is Rounding.NEAR:
+        hi = min(bisect_left(array, value), n - 1)
+        lo = max(hi - 1, 0)
+        return lo if value - array[lo] < array[hi] - value else hi
 
 
-if __name__ == "__main__":
-    array = [1, 3, 4, 5, 6, 7, 8]
-    value = 3
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
+def interval_to_slice(data: np.ndarray, low_value: float, hi_value: float) -> slice | None:
+    """
+    Slice of data covering [low_value, hi_value], extended with the nearest sample on either side (if present) so
+    that a plotted line runs up to the edges of the interval.
+    """
+    if len(data) > 0:
+        starts, stops = intervals_to_slices(data, low_value, hi_value)
+        return slice(int(starts), int(stops))
 
-    array = [1, 3, 4, 5, 6, 7, 8]
-    value = 2
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
 
-    array = [1, 3, 4, 5, 6, 7, 8]
-    value = 0
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
+def intervals_to_slices(data: np.ndarray, low_values, hi_values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized interval_to_slice: returns the arrays of start and stop indices for the given interval bounds.
+    """
+    starts = np.maximum(np.searchsorted(data, low_values, side='right') - 1, 0)
+    stops = np.minimum(np.searchsorted(data, hi_values, side='left') + 1, len(data))
+    return starts, stops
 
-    array = [1, 3, 4, 5, 6, 7, 8]
-    value = 9
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
 
-    array = [1, 3, 4, 5, 6, 7, 8]
-    value = 4.2
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
+if __name__ == "__main__":
+    import time
 
     array = [1, 3, 4, 5, 6, 7, 8]
-    value = 4.8
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
-
-    array = [8, 7, 6, 5, 4, 3, 1]
-    value = 0
-    print(f"value {value} is found at position {b_search(array, value)} in array {array}")
+    for value in [3, 2, 0, 9, 4.2, 4.8]:
+        print(f"value {value} is found at position {b_search(array, value)} in array {array}")
+
+    def legacy_b_search(array, value, rounding=Rounding.NEAR):  # the hand-written bisection this module used to have
+        lo = 0
+        hi = len(array) - 1
+        while lo < hi:
+            m = int((lo + hi) / 2)
+            if array[m] < value:
+                lo = m
+            elif array[m] > value:
+                hi = m
+            elif array[m] == value:
+                return m
+            if hi - lo <= 1:
+                if rounding is Rounding.NEAR:
+                    return lo if value - array[lo] < array[hi] - value else hi
+                elif rounding is Rounding.UP:
+                    return hi
+                elif rounding is Rounding.DOWN:
+                    return lo
+
+    n_samples, n_intervals = 10_000_000, 10_000
+    timestamps = 1.7e9 + 10.0 * np.arange(n_samples)
+    timestamps_list = timestamps.tolist()
+    rng = np.random.default_rng(0)
+    lows = np.sort(rng.uniform(timestamps[0], timestamps[-1], n_intervals))
+    his = lows + 3600.0
+
+    t0 = time.perf_counter()
+    legacy = [(legacy_b_search(timestamps_list, lo, Rounding.DOWN), legacy_b_search(timestamps_list, hi, Rounding.UP))
+              for lo, hi in zip(lows, his)]
+    t1 = time.perf_counter()
+    single = [interval_to_slice(timestamps, lo, hi) for lo, hi in zip(lows, his)]
+    t2 = time.perf_counter()
+    starts, stops = intervals_to_slices(timestamps, lows, his)
+    t3 = time.perf_counter()
+    assert all(s.start == lo and s.stop == hi + 1 for s, (lo, hi) in zip(single, legacy))
+    assert np.array_equal(starts, [s.start for s in single]) and np.array_equal(stops, [s.stop for s in single])
+    print(f"{n_intervals} intervals on {n_samples} samples: legacy b_search {1e3 * (t1 - t0):.1f} ms, "
+          f"interval_to_slice {1e3 * (t2 - t1):.1f} ms, intervals_to_slices {1e3 * (t3 - t2):.1f} ms")
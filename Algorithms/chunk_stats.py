@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+import math
+import numpy as np
+
+"""
+Time-partitioned chunk statistics
+
+The samples of a (sorted) timestamp column are partitioned into chunks of c_CHUNK_SECONDS (UTC days by default); only
+non-empty chunks are kept. Per column the min, max, sum and count of the valid (non-NaN) samples are kept per chunk.
+They are computed lazily: a range query computes the statistics of the chunks it fully covers (once, with reduceat) and
+reads the samples of the partial chunks at both ends. Other chunks are never touched, so for memory-mapped columns only
+the pages of the queried range are read. After appending samples only the last chunk has to be recomputed.
+"""
+
+c_CHUNK_SECONDS = 86400.0
+
+
+@dataclass
+class RangeStats:
+
+    min: float
+    max: float
+    sum: float
+    count: int
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count > 0 else math.nan
+
+    def combine(self, other: "RangeStats") -> "RangeStats":
+        return RangeStats(min=float(np.fmin(self.min, other.min)), max=float(np.fmax(self.max, other.max)),
+                          sum=self.sum + other.sum, count=self.count + other.count)
+
+    @classmethod
+    def of(cls, data: np.ndarray) -> "RangeStats":
+        valid = data[~np.isnan(data)]
+        if valid.size == 0:
+            return cls(min=math.nan, max=math.nan, sum=0.0, count=0)
+        return cls(min=float(valid.min()), max=float(valid.max()), sum=float(valid.sum()), count=int(valid.size))
+
+
+class ChunkIndex:
+    """
+    starts holds the index of the first sample of every chunk, followed by the number of samples. If previous is the
+    index of a prefix of timestamps, only its last chunk is recomputed.
+    """
+
+    def __init__(self, timestamps: np.ndarray, chunk_seconds: float = c_CHUNK_SECONDS, previous: "ChunkIndex | None" = None):
+        self.timestamps = timestamps
+        self.chunk_seconds = chunk_seconds
+        if previous is not None and len(previous) > 0 and previous.chunk_seconds == chunk_seconds:
+            self.starts = np.concatenate((previous.starts[:-2], self.chunk_starts(timestamps, int(previous.starts[-2]), chunk_seconds)))
+        else:
+            self.starts = self.chunk_starts(timestamps, 0, chunk_seconds)
+
+    @staticmethod
+    def chunk_starts(timestamps: np.ndarray, first: int, chunk_seconds: float) -> np.ndarray:
+        if len(timestamps) <= first:
+            return np.array([first], dtype=np.int64)
+        edges = np.arange(math.floor(timestamps[first] / chunk_seconds) + 1, math.floor(timestamps[-1] / chunk_seconds) + 1) * chunk_seconds
+        starts = np.searchsorted(timestamps, edges, side='left')  # lege chunks vallen samen met de volgende
+        return np.unique(np.concatenate(([first], starts, [len(timestamps)]))).astype(np.int64)
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def chunk_range(self, start: int, stop: int) -> tuple[int, int]:
+        """The chunks [c0, c1) that lie completely within the samples [start, stop); c1 <= c0 if there are none"""
+        c0 = int(np.searchsorted(self.starts, start, side='left'))
+        c1 = int(np.searchsorted(self.starts[1:], stop, side='right'))
+        return c0, c1
+
+
+class ChunkStats:
+    """
+    Lazily computed per-chunk statistics of data. If previous holds the statistics of earlier data of which the first
+    previous.valid_until samples are unchanged, the chunks within that prefix are taken over.
+    """
+
+    def __init__(self, data: np.ndarray, index: ChunkIndex, previous: "ChunkStats | None" = None):
+        self.data = data
+        self.index = index
+        self.valid_until = len(data)  # aantal samples waarvoor de statistieken gelden, zie DataStore
+        n_chunks = len(index)
+        self.min = np.full(n_chunks, np.nan)
+        self.max = np.full(n_chunks, np.nan)
+        self.sum = np.zeros(n_chunks)
+        self.count = np.zeros(n_chunks, dtype=np.int64)
+        self.computed = np.zeros(n_chunks, dtype=bool)
+        if previous is not None:
+            # chunks binnen het ongewijzigde deel, waarvan begin en eind in beide indexen gelijk zijn
+            n_kept = min(int(np.searchsorted(previous.index.starts[1:], previous.valid_until, side='right')), n_chunks)
+            if (differs := np.flatnonzero(previous.index.starts[:n_kept + 1] != index.starts[:n_kept + 1])).size > 0:
+                n_kept = max(int(differs[0]) - 1, 0)
+            for name in ['min', 'max', 'sum', 'count', 'computed']:
+                getattr(self, name)[:n_kept] = getattr(previous, name)[:n_kept]
+
+    def compute(self, c0: int, c1: int):
+        if (missing := np.flatnonzero(~self.computed[c0:c1])).size == 0:
+            return
+        lo, hi = c0 + int(missing[0]), c0 + int(missing[-1]) + 1
+        data = self.data[self.index.starts[lo]:self.index.starts[hi]]
+        offsets = self.index.starts[lo:hi] - self.index.starts[lo]
+        valid = ~np.isnan(data)
+        self.min[lo:hi] = np.fmin.reduceat(data, offsets)
+        self.max[lo:hi] = np.fmax.reduceat(data, offsets)
+        self.sum[lo:hi] = np.add.reduceat(np.where(valid, data, 0.0), offsets)
+        self.count[lo:hi] = np.add.reduceat(valid, offsets, dtype=np.int64)
+        self.computed[lo:hi] = True
+
+    def range_stats(self, start: int, stop: int) -> RangeStats:
+        """Statistics of the valid samples in [start, stop)"""
+        c0, c1 = self.index.chunk_range(start, stop)
+        if c1 <= c0:
+            return RangeStats.of(self.data[start:stop])
+        self.compute(c0, c1)
+        if (counts := self.count[c0:c1]).sum() > 0:
+            chunks = RangeStats(min=float(np.nanmin(self.min[c0:c1][counts > 0])), max=float(np.nanmax(self.max[c0:c1][counts > 0])),
+                                sum=float(self.sum[c0:c1].sum()), count=int(counts.sum()))
+        else:
+            chunks = RangeStats(min=math.nan, max=math.nan, sum=0.0, count=0)
+        return (RangeStats.of(self.data[start:self.index.starts[c0]]).combine(chunks)
+                .combine(RangeStats.of(self.data[self.index.starts[c1]:stop])))
+
+
+if __name__ == "__main__":
+    import time
+
+    n_samples = 5 * 365 * 8640  # vijf jaar 10-seconden data
+    rng = np.random.default_rng(0)
+    timestamps = 1.7e9 + 10.0 * np.arange(n_samples)
+    data = np.where(rng.random(n_samples) < 0.001, np.nan, rng.uniform(0, 5000, n_samples))
+    index = ChunkIndex(timestamps)
+    stats = ChunkStats(data, index)
+    for days in [1, 30, 365, 5 * 365]:
+        start, stop = 1000, 1000 + days * 8640 - 2000
+        t0 = time.perf_counter()
+        scan = RangeStats.of(data[start:stop])
+        t_scan = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        first = stats.range_stats(start, stop)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cached = stats.range_stats(start, stop)
+        t_cached = time.perf_counter() - t0
+        assert cached.count == scan.count and cached.min == scan.min and cached.max == scan.max
+        assert math.isclose(cached.sum, scan.sum, rel_tol=1e-9)
+        print(f"{days:5} days: scan {1000 * t_scan:7.2f} ms, chunks first {1000 * t_first:7.2f} ms, "
+              f"chunks cached {1000 * t_cached:6.2f} ms ({len(index)} chunks)")
+    longer = np.concatenate((timestamps, timestamps[-1] + 10.0 * np.arange(1, 8641)))
+    extended_index = ChunkIndex(longer, previous=index)
+    assert np.array_equal(extended_index.starts, ChunkIndex(longer).starts)
+    extended = ChunkStats(np.concatenate((data, rng.uniform(0, 5000, 8640))), extended_index, previous=stats)
+    print(f"after appending a day {extended.computed.sum()} of {len(extended_index)} chunks are still computed")
+    full, scan = extended.range_stats(0, len(longer)), RangeStats.of(extended.data)
+    assert full.count == scan.count and full.max == scan.max and math.isclose(full.sum, scan.sum, rel_tol=1e-9)
@@ -0,0 +1,88 @@
+import math
+import time
+import numpy as np
+import matplotlib.dates as mdates
+
+"""
+Vectorized conversion of timestamps to matplotlib date numbers and local time strings
+
+The plots show local time: matplotlib converts a naive datetime.fromtimestamp(t) as if it were UTC. The date number of
+t is thus (t + utc_offset(t)) / 86400 plus the date number of the epoch. The UTC offset (time zone, daylight saving
+time) is looked up once per day; only on a day where it changes the moment of the change is searched (by bisection on
+whole seconds). The offsets of all samples then follow from one searchsorted over these transitions.
+"""
+
+c_SECONDS_PER_DAY = 86400
+
+
+def utc_offset(timestamp: float) -> int:
+    return time.localtime(timestamp).tm_gmtoff
+
+
+def offset_transitions(start: float, end: float) -> tuple[np.ndarray, np.ndarray]:
+    """The moments in [start, end] from which the UTC offset applies, and these offsets; the first moment is start"""
+    moments, offsets = [start], [utc_offset(start)]
+    for day in range(math.floor(start / c_SECONDS_PER_DAY) + 1, math.floor(end / c_SECONDS_PER_DAY) + 2):
+        if (offset := utc_offset(day * c_SECONDS_PER_DAY)) != offsets[-1]:
+            lo, hi = max(math.floor(moments[-1]), (day - 1) * c_SECONDS_PER_DAY), day * c_SECONDS_PER_DAY
+            while hi - lo > 1:  # de overgang ligt in (lo, hi]
+                mid = (lo + hi) // 2
+                lo, hi = (lo, mid) if utc_offset(mid) == offset else (mid, hi)
+            moments.append(hi)
+            offsets.append(offset)
+    return np.array(moments, dtype=np.float64), np.array(offsets, dtype=np.float64)
+
+
+def timestamps_to_date_numbers(timestamps: np.ndarray) -> np.ndarray:
+    """Date numbers of the local time of sorted timestamps, as matplotlib would compute them from datetime.fromtimestamp"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) == 0:
+        return np.empty(0)
+    moments, offsets = offset_transitions(float(timestamps[0]), float(timestamps[-1]))
+    sample_offsets = offsets[np.searchsorted(moments, timestamps, side='right') - 1]
+    return (timestamps + sample_offsets) / c_SECONDS_PER_DAY + mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+
+
+def timestamps_to_local_strings(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Local time of sorted timestamps as strings, per timestamp as str(datetime.fromtimestamp(t)) gives it: the
+    fraction is rounded half-even to microseconds, which are only shown when they are not zero
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=str)
+    moments, offsets = offset_transitions(float(timestamps[0]), float(timestamps[-1]))
+    seconds = np.floor(timestamps)
+    micros = np.round((timestamps - seconds) * 1e6)
+    carry = micros == 1e6
+    seconds, micros = seconds + carry, np.where(carry, 0.0, micros)
+    local = ((seconds + offsets[np.searchsorted(moments, seconds, side='right') - 1]).astype('datetime64[s]') +
+             micros.astype('timedelta64[us]'))
+    strings = np.where(micros == 0, np.datetime_as_string(local, unit='s'), np.datetime_as_string(local, unit='us'))
+    return np.char.replace(strings, 'T', ' ')
+
+if __name__ == "__main__":
+    import os
+    from datetime import datetime
+
+    os.environ['TZ'] = 'Europe/Amsterdam'  # met zomer- en wintertijd
+    time.tzset()
+    n_samples = 365 * 8640  # een jaar 10-seconden data, met twee overgangen
+    timestamps = 1.7e9 + 10.0 * np.arange(n_samples) + 3.0
+
+    start = time.perf_counter()
+    expected = mdates.date2num([datetime.fromtimestamp(timestamp) for timestamp in timestamps])
+    t_before = time.perf_counter() - start
+    start = time.perf_counter()
+    date_numbers = timestamps_to_date_numbers(timestamps)
+    t_after = time.perf_counter() - start
+    print(f"{n_samples} samples: datetime.fromtimestamp + date2num {t_before:.2f} s, vectorized {1000 * t_after:.1f} ms")
+    assert np.allclose(date_numbers, expected, rtol=0, atol=1e-9)
+    assert all(timestamps_to_local_strings(timestamps[i:i + 1])[0] == str(datetime.fromtimestamp(timestamps[i]))
+               for i in range(0, n_samples, 997))
+    fractions = timestamps[::991] + np.random.default_rng(0).random(len(timestamps[::991]))
+    halves = timestamps[:10] + 0.5e-6 * np.arange(10)  # halve microseconden: half-even afgerond
+    mixed = np.sort(np.concatenate((timestamps[::997], fractions, halves)))
+    assert list(timestamps_to_local_strings(mixed)) == [str(datetime.fromtimestamp(timestamp)) for timestamp in mixed]
+    print(f"{len(offset_transitions(timestamps[0], timestamps[-1])[0]) - 1} UTC offset transitions, max difference "
+          f"{np.abs(date_numbers - expected).max() * 86400 * 1e6:.2f} us")
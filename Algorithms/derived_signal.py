@@ -1,97 +1,143 @@
+import ast
+from functools import lru_cache
+import numpy as np
 from Models.signal import Signal
+from Algorithms.gap_fill import fill_gaps
+from Utils.config import Config
 
 
 class DerivedSignal:
 
     def __init__(self, name: str, formula_text: str, data: dict[str, Signal]):
         self.name = name
-        self.formula = Formula(formula_text, data)  # bijv. SOLAR - CURRENT_PRODUCTION_PHASE1 + CURRENT_USAGE_PHASE1
+        self.formula = compile_formula(formula_text)  # bijv. SOLAR - CURRENT_PRODUCTION_PHASE1 + CURRENT_USAGE_PHASE1
         self.data = data
 
-    def get(self) -> Signal:
-        op = self.formula.evaluate()
-        if self.data and all((operand in self.data for operand in op.all_operands())) is True:
-            return op.exec()
-
-
-
-class Operation:
-    """
-    Holder for binary operation such as '+', '-'
-    """
-
-    def __init__(self, operator, operand1, operand2, data: dict[str, Signal]):
-        self.operator = operator
-        self.operand1 = operand1
-        self.operand2 = operand2
-        self.data = data
+    def get(self, start: int = 0) -> Signal:
+        """
+        Evalueert de formule vanaf sample start. Voor start > 0 moet start een sample zijn dat voor alle operanden
+        geldig is (zie last_common_valid_index), zodat het opvullen van de staart overeenkomt met dat van het geheel.
+        """
+        if self.data and all((operand in self.data for operand in self.formula.operands)) is True:
+            if start == 0:
+                columns = {operand: self.data[operand].fix_signal().data for operand in self.formula.operands}
+            else:
+                mode, hold_edges = Config().get_gap_fill_mode(), Config().get_gap_fill_hold_edges()
+                columns = {operand: fill_gaps(self.data[operand].data[start:], mode, hold_edges) for operand in self.formula.operands}
+            unit = self.data[self.formula.operands[0]].unit if self.formula.operands else ""
+            return Signal(name=self.name, data=self.formula.evaluate(columns), unit=unit)
 
-    def next_level(self, operator, operand2):
-        self.operand1 = Operation(self.operator, self.operand1, self.operand2, self.data)
-        self.operator = operator
-        self.operand2 = operand2
 
-    def exec(self) -> Signal:
-        if type(self.operand1) == Operation:
-            result = self.operand1.exec()
-        else:
-            result = self.data[self.operand1]
-        result = result.fix_signal()
-        signal2 = self.data[self.operand2].fix_signal()
-        if self.operator == '+':
-            return Signal(name="sum", data=[result[i] + signal2[i] for i in range(len(result))], unit=result.unit)
-        elif self.operator == '-':
-            return Signal(name="diff", data=[result[i] - signal2[i] for i in range(len(result))], unit=result.unit)
-
-    def all_operands(self) -> list[str]:
-        if type(self.operand1) == Operation:
-            return self.operand1.all_operands() + [self.operand2]
-        else:
-            return [self.operand1, self.operand2]
+@lru_cache(maxsize=None)
+def compile_formula(formula_text: str):
+    """Compiles a formula once; the compiled Formula is shared by all users of the same formula text"""
+    return Formula(formula_text)
 
 
 class Formula:
     """
-    Holds a formule such as 'A + B - C'.
-    Converts into a possibly stacked operation.
-    """
+    Holds a formula such as 'A + B - C' or 'clip(SOLAR - 2 * (A + B), 0, 5000)', compiled into a program.
 
-    def __init__(self, formula_text: str, data: dict[str, Signal]):
-        self.formula_text = formula_text
-        self.data = data
-        self.num = 0  # iterator
+    Supported are + - * / (and unary -), numeric constants, parentheses and the functions abs, min, max and clip.
+    The program is a list of ufunc instructions (ufunc, register, arguments) whose arguments are operand columns,
+    constants or registers. Registers are reused as soon as their value has been consumed. Evaluation runs the whole
+    program per block of samples, so the data is passed only once and the registers stay small.
+    """
 
-    def check_syntax(self):
-        pass  # TODO
+    c_BLOCK_SIZE = 1 << 16
+    c_BINARY_OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+    c_UNARY_OPERATORS = {ast.USub: np.negative}
+    c_FUNCTIONS = {'abs': 1, 'min': None, 'max': None, 'clip': 3}  # number of arguments, None is variadic
 
-    def evaluate(self) -> Operation:
-        binary_fragment = next(self)
-        op = Operation(binary_fragment[1], binary_fragment[0], binary_fragment[2], self.data)
+    def __init__(self, formula_text: str):
+        self.formula_text = formula_text
+        self.operands: list[str] = []
+        self.program: list[tuple[np.ufunc, int, tuple]] = []
+        self.n_registers = 0
+        self.free_registers: list[int] = []
         try:
-            while next_binary_fragment := next(self):
-                op.next_level(next_binary_fragment[0], next_binary_fragment[1])
-        except StopIteration:
-            return op
-
-    def words(self) -> list[str]:
-        return self.formula_text.split()
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        if self.num >= len(self.words()):
-            raise StopIteration
-        else:
-            if self.num == 0:
-                self.num = 3
-                return self.words()[0], self.words()[1], self.words()[2]
+            tree = ast.parse(formula_text.strip(), mode='eval')
+        except SyntaxError:
+            raise RuntimeError(f"Invalid formula '{formula_text}'")
+        self.result = self.compile(tree.body)
+        del self.free_registers
+
+    def compile(self, node: ast.AST) -> tuple:
+        """Emits the instructions for node; returns a reference ('column', name), ('const', value) or ('reg', i)"""
+        if isinstance(node, ast.Name):
+            if node.id not in self.operands:
+                self.operands.append(node.id)
+            return 'column', node.id
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return 'const', float(node.value)
+        elif isinstance(node, ast.BinOp) and type(node.op) in self.c_BINARY_OPERATORS:
+            return self.emit(self.c_BINARY_OPERATORS[type(node.op)], self.compile(node.left), self.compile(node.right))
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return self.compile(node.operand)
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in self.c_UNARY_OPERATORS:
+            return self.emit(self.c_UNARY_OPERATORS[type(node.op)], self.compile(node.operand))
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.c_FUNCTIONS
+              and not node.keywords and self.c_FUNCTIONS[node.func.id] in (None, len(node.args)) and node.args):
+            args = [self.compile(arg) for arg in node.args]
+            if node.func.id == 'abs':
+                return self.emit(np.absolute, args[0])
+            elif node.func.id == 'clip':
+                return self.emit(np.minimum, self.emit(np.maximum, args[0], args[1]), args[2])
             else:
-                self.num += 2
-                return self.words()[self.num - 2], self.words()[self.num - 2 + 1]
+                func = np.minimum if node.func.id == 'min' else np.maximum
+                result = args[0]
+                for arg in args[1:]:
+                    result = self.emit(func, result, arg)
+                return result
+        raise RuntimeError(f"Unsupported expression '{ast.unparse(node)}' in formula '{self.formula_text}'")
+
+    def emit(self, ufunc: np.ufunc, *args: tuple) -> tuple:
+        if all(arg[0] == 'const' for arg in args):  # constant folding
+            return 'const', float(ufunc(*(arg[1] for arg in args)))
+        for arg in args:
+            if arg[0] == 'reg':
+                self.free_registers.append(arg[1])
+        if self.free_registers:
+            register = self.free_registers.pop()
+        else:
+            register = self.n_registers
+            self.n_registers += 1
+        self.program.append((ufunc, register, args))
+        return 'reg', register
+
+    def evaluate(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        n_samples = len(columns[self.operands[0]]) if self.operands else 0
+        result = np.empty(n_samples)
+        if self.result[0] == 'const':
+            result.fill(self.result[1])
+            return result
+        elif self.result[0] == 'column':
+            result[:] = columns[self.result[1]]
+            return result
+        registers = [np.empty(min(self.c_BLOCK_SIZE, n_samples)) for _ in range(self.n_registers)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, n_samples, self.c_BLOCK_SIZE):
+                stop = min(start + self.c_BLOCK_SIZE, n_samples)
+                block = [register[:stop - start] for register in registers]
+                for ufunc, register, args in self.program:
+                    ufunc(*(self.argument(arg, block, columns, start, stop) for arg in args), out=block[register])
+                result[start:stop] = block[self.result[1]]
+        return result
+
+    @staticmethod
+    def argument(arg: tuple, block: list[np.ndarray], columns: dict[str, np.ndarray], start: int, stop: int):
+        if arg[0] == 'reg':
+            return block[arg[1]]
+        elif arg[0] == 'column':
+            return columns[arg[1]][start:stop]
+        return arg[1]
 
 
 if __name__ == "__main__":
-    data = {"SOLAR": [1, 1, 1], "CURRENT_PRODUCTION_PHASE1": [6, 6, 6], "CURRENT_USAGE_PHASE1": [3, 3, 3], "NOG_IETS": [12, 12, 12]}
+    data = {"SOLAR": Signal("SOLAR", [1, 1, None], "W"), "CURRENT_PRODUCTION_PHASE1": Signal("CURRENT_PRODUCTION_PHASE1", [6, 6, 6], "W"),
+            "CURRENT_USAGE_PHASE1": Signal("CURRENT_USAGE_PHASE1", [3, 3, 3], "W"), "NOG_IETS": Signal("NOG_IETS", [12, 12, 12], "W")}
     derivedSignal = DerivedSignal("verbruik", "SOLAR - CURRENT_PRODUCTION_PHASE1 + CURRENT_USAGE_PHASE1 -  NOG_IETS", data)
     print(derivedSignal.get())
+    derivedSignal = DerivedSignal("begrensd", "clip(2 * (SOLAR - CURRENT_PRODUCTION_PHASE1) / 4, -1, max(NOG_IETS, 0))", data)
+    print(derivedSignal.formula.program)
+    print(derivedSignal.get())
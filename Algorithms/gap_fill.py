@@ -0,0 +1,68 @@
+from enum import Enum
+import numpy as np
+
+"""
+Gap filling
+
+Missing samples (NaN) in a signal are replaced, vectorized, according to a GapFill mode:
+    LINEAR  : runs of missing samples are interpolated linearly between the neighbouring valid samples. A single
+              missing sample thus becomes the average of its neighbours.
+    HOLD    : the last valid sample is held.
+    ZERO    : missing samples become 0.0.
+Missing samples at the edges of the signal (before the first or after the last valid sample) become 0.0 in every
+mode, as they always did; with hold_edges LINEAR and HOLD hold the nearest valid sample there instead (config.ini:
+gap_fill_hold_edges). A signal without any valid sample becomes all zeros. A signal without missing samples is
+returned as is (no copy).
+"""
+
+
+class GapFill(Enum):
+
+    LINEAR = "linear"
+    HOLD = "hold"
+    ZERO = "zero"
+
+
+def fill_gaps(data: np.ndarray, mode: GapFill = GapFill.LINEAR, hold_edges: bool = False) -> np.ndarray:
+    missing = np.isnan(data)
+    if not missing.any():
+        return data
+    if mode is GapFill.ZERO or missing.all():
+        return np.where(missing, 0.0, data)
+    valid_idx = np.flatnonzero(~missing)
+    if mode is GapFill.LINEAR:
+        # np.interp holds the first/last valid value beyond the edges
+        filled = np.interp(np.arange(len(data)), valid_idx, data[valid_idx])
+    else:
+        last_valid = np.maximum.accumulate(np.where(missing, 0, np.arange(len(data))))
+        last_valid[:valid_idx[0]] = valid_idx[0]  # leading edge: hold the first valid sample
+        filled = data[last_valid]
+    if not hold_edges:
+        filled[:valid_idx[0]] = 0.0
+        filled[valid_idx[-1] + 1:] = 0.0
+    return filled
+
+
+def last_common_valid_index(columns: list[np.ndarray], stop: int) -> int | None:
+    """
+    Index of the last sample before stop that is valid in all columns, or None. Filling the columns from this index
+    onwards gives the same values as filling the complete columns, which allows for evaluating only a tail.
+    """
+    window = 1024
+    while True:
+        start = max(stop - window, 0)
+        valid = np.logical_and.reduce([~np.isnan(column[start:stop]) for column in columns])
+        if (indices := np.flatnonzero(valid)).size > 0:
+            return start + int(indices[-1])
+        if start == 0:
+            return None
+        window *= 4
+
+
+if __name__ == "__main__":
+    array = np.array([np.nan, 1.0, np.nan, 3.0, np.nan, np.nan, 6.0, np.nan])
+    for mode in GapFill:
+        for hold_edges in [False, True]:
+            print(f"{mode.value:6} hold_edges={hold_edges!s:5}: {fill_gaps(array, mode, hold_edges)}")
+    assert np.array_equal(fill_gaps(array), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 0.0])
+    assert np.array_equal(fill_gaps(array, GapFill.HOLD, hold_edges=True), [1.0, 1.0, 1.0, 3.0, 3.0, 3.0, 6.0, 6.0])
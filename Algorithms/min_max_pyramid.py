@@ -0,0 +1,114 @@
+import numpy as np
+
+"""
+Min/max pyramid for plotting
+
+For plotting a long signal it suffices to draw, per pixel column, the minimum and the maximum sample; peaks stay
+visible. The pyramid keeps, per level, the index of the minimum and of the maximum sample of every bucket of
+c_BASE * c_FACTOR ** level samples. Level 0 is built from the samples, every next level from the previous one.
+Only complete buckets are kept; levels are built when first needed.
+
+downsample returns the indices of the samples to draw for a range: the samples themselves if there are at most
+max_points, otherwise the minima and maxima of the coarsest level that still gives at least max_points / c_FACTOR
+points, so a line never has more than max_points points. Missing samples (NaN) are only selected for a bucket without
+valid samples, which keeps gaps visible as gaps.
+"""
+
+c_BASE = 16
+c_FACTOR = 2
+
+
+def bucket_extremes(data: np.ndarray, bucket_size: int, offset: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Indices (relative to offset) of the minimum and maximum of every complete bucket of data"""
+    n_buckets = len(data) // bucket_size
+    buckets = data[:n_buckets * bucket_size].reshape(n_buckets, bucket_size)
+    missing = np.isnan(buckets)
+    starts = offset + bucket_size * np.arange(n_buckets)
+    return (starts + np.argmin(np.where(missing, np.inf, buckets), axis=1),
+            starts + np.argmax(np.where(missing, -np.inf, buckets), axis=1))
+
+
+class MinMaxPyramid:
+
+    def __init__(self, data: np.ndarray, previous: "MinMaxPyramid | None" = None):
+        self.data = data
+        self.valid_until = len(data)  # aantal samples waarvoor de pyramide geldt, zie DataStore
+        self.levels: list[tuple[np.ndarray, np.ndarray]] = []  # per level de indices van minima en maxima
+        if previous is not None:
+            n_kept = previous.valid_until // c_BASE
+            for i_min, i_max in previous.levels:
+                n_kept = min(n_kept, len(i_min))
+                self.levels.append((i_min[:n_kept], i_max[:n_kept]))
+                n_kept //= c_FACTOR
+
+    @staticmethod
+    def bucket_size(level: int) -> int:
+        return c_BASE * c_FACTOR ** level
+
+    def level(self, level: int) -> tuple[np.ndarray, np.ndarray]:
+        """De minima en maxima van level, (bij)gebouwd tot het aantal samples van data"""
+        for k in range(level + 1):
+            n_buckets = len(self.data) // self.bucket_size(k)
+            if k < len(self.levels) and len(self.levels[k][0]) == n_buckets:
+                continue
+            n_done = len(self.levels[k][0]) if k < len(self.levels) else 0
+            if k == 0:
+                new = bucket_extremes(self.data[n_done * c_BASE:], c_BASE, n_done * c_BASE)
+            else:
+                lower_min, lower_max = self.levels[k - 1]
+                groups = slice(n_done * c_FACTOR, n_buckets * c_FACTOR)
+                new = (self.select(lower_min[groups], np.argmin, np.inf), self.select(lower_max[groups], np.argmax, -np.inf))
+            if k < len(self.levels):
+                self.levels[k] = (np.concatenate((self.levels[k][0], new[0])), np.concatenate((self.levels[k][1], new[1])))
+            else:
+                self.levels.append(new)
+        return self.levels[level]
+
+    def select(self, indices: np.ndarray, arg_function, missing_value: float) -> np.ndarray:
+        """Van iedere groep van c_FACTOR indices die van het minimum (argmin) of maximum (argmax)"""
+        groups = indices.reshape(-1, c_FACTOR)
+        values = self.data[groups]
+        choice = arg_function(np.where(np.isnan(values), missing_value, values), axis=1)
+        return np.take_along_axis(groups, choice[:, None], axis=1)[:, 0]
+
+    def downsample(self, start: int, stop: int, max_points: int) -> slice | np.ndarray:
+        """De samples [start, stop) als slice, of de indices van de minima en maxima als dat meer dan max_points zijn"""
+        if stop - start <= max_points:
+            return slice(start, stop)
+        level = 0
+        while 2 * (stop - start) // self.bucket_size(level) > max_points:
+            level += 1
+        bucket_size = self.bucket_size(level)
+        i_min, i_max = self.level(level)
+        first = -(-start // bucket_size)
+        last = max(min(stop // bucket_size, len(i_min)), first)
+        head_stop = min(first * bucket_size, stop)
+        head = bucket_extremes(self.data[start:head_stop], head_stop - start, start) if head_stop > start else ()
+        tail_start = last * bucket_size
+        tail = bucket_extremes(self.data[tail_start:stop], stop - tail_start, tail_start) if stop > tail_start else ()
+        return np.unique(np.concatenate((*head, i_min[first:last], i_max[first:last], *tail)))
+
+
+if __name__ == "__main__":
+    import time
+
+    n_samples = 30 * 8640  # een maand 10-seconden data
+    rng = np.random.default_rng(0)
+    data = np.where(rng.random(n_samples) < 0.001, np.nan, rng.uniform(0, 5000, n_samples))
+    data[123_457] = 1e5  # een piek moet zichtbaar blijven
+    start = time.perf_counter()
+    pyramid = MinMaxPyramid(data)
+    indices = pyramid.downsample(0, n_samples, 2000)
+    print(f"{n_samples} samples -> {len(indices)} points in {1000 * (time.perf_counter() - start):.1f} ms (incl. building)")
+    assert len(indices) <= 2000 and 123_457 in indices
+    assert np.nanmin(data[indices]) == np.nanmin(data) and np.nanmax(data[indices]) == np.nanmax(data)
+    start = time.perf_counter()
+    indices = pyramid.downsample(1000, n_samples - 1000, 2000)
+    print(f"query after building: {1000 * (time.perf_counter() - start):.2f} ms")
+    longer = np.concatenate((data, rng.uniform(0, 5000, 8640)))
+    extended = MinMaxPyramid(longer, previous=pyramid)
+    extended.downsample(0, len(longer), 2000)
+    rebuilt = MinMaxPyramid(longer)
+    rebuilt.downsample(0, len(longer), 2000)
+    assert all(np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1]) for a, b in zip(extended.levels, rebuilt.levels))
+    print(f"incremental rebuild equals full rebuild ({len(extended.levels)} levels)")
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from Utils.config import Config
 from Models.signal import Signal
 from Algorithms.golden_section_search import gssrec
@@ -6,6 +7,8 @@ from Algorithms.golden_section_search import gssrec
 
 class SignalShift:
 
+    c_FFT_MIN_LAGS = 64  # vanaf dit aantal verschuivingen wordt de kruiscorrelatie via de FFT berekend
+
     def __init__(self, signal: Signal):
         self.signal = signal
         self.cross_corr = None
@@ -13,30 +16,40 @@ class SignalShift:
     def assess_shift(self, other_signal, kernel_size):
         assert len(self.signal) == len(other_signal)
         self.cross_corr = self.calc_cross_corr(self.signal, other_signal, kernel_size)
-        peaked_signal = PeakedSignal({t - kernel_size: v for t, v in enumerate(self.cross_corr[1])})
+        peaked_signal = PeakedSignal(dict(zip(*self.cross_corr)))
         return peaked_signal.find_maximum(search_range=Config().getSearchRangeMaxCrossCorr())
 
     @staticmethod
-    def calc_cross_corr(x_data, y_data, kernel_size):
-        x_fix = [x_val if x_val else 0.0 for x_val in x_data]
-        y_fix = [y_val if y_val else 0.0 for y_val in y_data]
-        x_mean = sum(x_fix) / len(x_fix)
-        y_mean = sum(y_fix) / len(y_fix)
-        x_demean = [x_val - x_mean for x_val in x_fix]
-        y_demean = [y_val - y_mean for y_val in y_fix]
-        std_x = math.sqrt(sum([x**2 for x in x_demean]) / len(x_demean))
-        std_y = math.sqrt(sum([y**2 for y in y_demean]) / len(y_demean))
-        cc = [0.0] * (2*kernel_size + 1)
-        t = [-kernel_size + i for i in range(2*kernel_size + 1)]
-        for i, x_val in enumerate(x_demean):
-            y_lims = max(0, i - kernel_size), min(len(x_demean)-1, i + kernel_size)
-            y_range = range(y_lims[0], y_lims[1] + 1)
-            if not (all([y_fix[i_y] == 0.0 for i_y in y_range]) and x_fix[i] == 0.0):
-                for j in range(y_lims[0], y_lims[1] + 1):
-                    cc[j + kernel_size - i] += x_val * y_demean[j]
-        for i, cc_val in enumerate(cc):
-            cc[i] /= (std_x * std_y * len(x_demean))
-        return t, cc
+    def calc_cross_corr(x_data, y_data, kernel_size: int = None, lags: tuple[int, int] = None) -> tuple[list[int], list[float]]:
+        """
+        Genormaliseerde kruiscorrelatie voor de verschuivingen lags = (min, max), standaard -kernel_size t/m kernel_size:
+        cc[L] = som over i van x[i] * y[i + L] (beide zonder gemiddelde) / (n * std_x * std_y). Ontbrekende samples
+        tellen als 0. Een sample i telt niet mee als x[i] en alle y in zijn venster [i + min, i + max] 0 zijn (nacht).
+        Bij weinig verschuivingen een inproduct per verschuiving, anders via de FFT.
+        """
+        min_lag, max_lag = lags if lags is not None else (-kernel_size, kernel_size)
+        x = np.nan_to_num(np.asarray(getattr(x_data, 'data', x_data), dtype=np.float64), nan=0.0)
+        y = np.nan_to_num(np.asarray(getattr(y_data, 'data', y_data), dtype=np.float64), nan=0.0)
+        n = len(x)
+        x_demean, y_demean = x - x.mean(), y - y.mean()
+        std_x, std_y = math.sqrt(np.dot(x_demean, x_demean) / n), math.sqrt(np.dot(y_demean, y_demean) / n)
+        n_nonzero = np.concatenate(([0], np.cumsum(y != 0.0)))  # aantal y ongelijk aan 0 voor ieder sample
+        window_start = np.clip(np.arange(n) + min_lag, 0, n)
+        window_stop = np.clip(np.arange(n) + max_lag + 1, 0, n)
+        active = (n_nonzero[window_stop] - n_nonzero[window_start] > 0) | (x != 0.0)
+        x_active = np.where(active, x_demean, 0.0)
+        t = list(range(min_lag, max_lag + 1))
+        if len(t) < SignalShift.c_FFT_MIN_LAGS:
+            cc = np.array([np.dot(x_active[max(0, -lag):min(n, n - lag)], y_demean[max(0, lag):min(n, n + lag)])
+                           if abs(lag) < n else 0.0 for lag in t])
+        else:
+            size = 1 << (2 * n - 1).bit_length()  # geen omloop voor verschuivingen kleiner dan n
+            correlation = np.fft.irfft(np.conj(np.fft.rfft(x_active, size)) * np.fft.rfft(y_demean, size), size)
+            lags_array = np.array(t)
+            cc = np.where(np.abs(lags_array) < n, correlation[lags_array % size], 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cc = cc / (std_x * std_y * n)
+        return t, cc.tolist()
 
     def do_shift(self, shift: float) -> list[float]:
         int_part = int(math.floor(shift))
@@ -148,3 +161,50 @@ if __name__ == "__main__":
     print(f"shifted over {shift}: {sig.do_shift(shift)}")
     shift = 0.2
     print(f"shifted over {shift}: {sig.do_shift(shift)}")
+
+    def calc_cross_corr_loop(x_data, y_data, kernel_size):
+        """De oorspronkelijke implementatie, als referentie"""
+        x_fix = [x_val if x_val and not math.isnan(x_val) else 0.0 for x_val in x_data]
+        y_fix = [y_val if y_val and not math.isnan(y_val) else 0.0 for y_val in y_data]
+        x_mean = sum(x_fix) / len(x_fix)
+        y_mean = sum(y_fix) / len(y_fix)
+        x_demean = [x_val - x_mean for x_val in x_fix]
+        y_demean = [y_val - y_mean for y_val in y_fix]
+        std_x = math.sqrt(sum([x**2 for x in x_demean]) / len(x_demean))
+        std_y = math.sqrt(sum([y**2 for y in y_demean]) / len(y_demean))
+        cc = [0.0] * (2*kernel_size + 1)
+        t = [-kernel_size + i for i in range(2*kernel_size + 1)]
+        for i, x_val in enumerate(x_demean):
+            y_lims = max(0, i - kernel_size), min(len(x_demean)-1, i + kernel_size)
+            y_range = range(y_lims[0], y_lims[1] + 1)
+            if not (all([y_fix[i_y] == 0.0 for i_y in y_range]) and x_fix[i] == 0.0):
+                for j in range(y_lims[0], y_lims[1] + 1):
+                    cc[j + kernel_size - i] += x_val * y_demean[j]
+        for i, cc_val in enumerate(cc):
+            cc[i] /= (std_x * std_y * len(x_demean))
+        return t, cc
+
+    import time
+
+    n_samples = 7 * 8640  # een week 10-seconden data
+    rng = np.random.default_rng(0)
+    daylight = np.clip(np.sin(2 * np.pi * np.arange(n_samples) / 8640), 0.0, None)  # 's nachts 0
+    solar = Signal("SOLAR", np.where(rng.random(n_samples) < 0.001, np.nan, 4000.0 * daylight * rng.uniform(0.8, 1.0, n_samples)), "W")
+    production = Signal("CURRENT_PRODUCTION", np.roll(solar.data, 2) * 0.7, "W")
+    kernel_size = Config().getCrossCorrKernelSize()
+    start = time.perf_counter()
+    expected = calc_cross_corr_loop(solar, production, kernel_size)
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    result = SignalShift.calc_cross_corr(solar, production, kernel_size)
+    t_vectorized = time.perf_counter() - start
+    assert result[0] == expected[0] and np.allclose(result[1], expected[1], rtol=1e-9, atol=0.0)
+    print(f"{n_samples} samples, {2 * kernel_size + 1} lags: loop {t_loop:.2f} s, vectorized {1000 * t_vectorized:.2f} ms")
+    start = time.perf_counter()
+    t_fft, cc_fft = SignalShift.calc_cross_corr(solar, production, lags=(-500, 200))
+    t_fft_run = time.perf_counter() - start
+    SignalShift.c_FFT_MIN_LAGS = 10 ** 6  # dezelfde verschuivingen met een inproduct per verschuiving
+    t_direct, cc_direct = SignalShift.calc_cross_corr(solar, production, lags=(-500, 200))
+    assert t_fft == t_direct and np.allclose(cc_fft, cc_direct, rtol=1e-9, atol=1e-12)
+    print(f"lags -500..200 via FFT in {1000 * t_fft_run:.1f} ms, equal to the direct computation; "
+          f"maximum at lag {t_fft[int(np.argmax(cc_fft))]}")
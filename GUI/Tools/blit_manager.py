@@ -0,0 +1,83 @@
+import time
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QGuiApplication
+from matplotlib.artist import Artist
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+
+
+class BlitManager:
+    """
+    Overlay van geanimeerde artists (selectie, cursor-annotaties) boven een canvas. Bij iedere volledige draw wordt de
+    achtergrond zonder deze artists bewaard; update() zet die achtergrond terug, tekent alleen de overlay en blit.
+    """
+
+    def __init__(self, canvas: FigureCanvasQTAgg):
+        self.canvas = canvas
+        self.background = None
+        self.artists: list[Artist] = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def add_artist(self, artist: Artist):
+        artist.set_animated(True)  # niet meer getekend bij een volledige draw, dus niet in de achtergrond
+        if artist not in self.artists:
+            self.artists.append(artist)
+
+    def remove_artist(self, artist: Artist):
+        if artist in self.artists:
+            self.artists.remove(artist)
+
+    def clear(self):
+        self.artists = []
+
+    def draw_artists(self):
+        self.artists = [artist for artist in self.artists if artist.figure is not None]  # bijv. verwijderd door ax.clear()
+        for artist in self.artists:
+            artist.figure.draw_artist(artist)
+
+    def update(self):
+        if self.background is None:
+            self.canvas.draw_idle()  # de achtergrond volgt uit de eerste draw
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class EventThrottle:
+    """
+    Geeft snel opeenvolgende events (muisbewegingen) ten hoogste eenmaal per verversing van het scherm door aan callback.
+    Tussenliggende events vervallen; het laatste event wordt altijd afgeleverd, zo nodig met een timer.
+    """
+
+    def __init__(self, callback, interval_ms: float | None = None):
+        self.callback = callback
+        if interval_ms is None:
+            screen = QGuiApplication.primaryScreen()
+            interval_ms = 1000.0 / (screen.refreshRate() if screen and screen.refreshRate() > 0 else 60.0)
+        self.interval_ms = interval_ms
+        self.pending = None
+        self.last_time = 0.0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def __call__(self, event):
+        self.pending = event
+        if not self.timer.isActive():
+            elapsed_ms = 1000.0 * (time.perf_counter() - self.last_time)
+            if elapsed_ms >= self.interval_ms:
+                self.flush()
+            else:
+                self.timer.start(int(self.interval_ms - elapsed_ms) + 1)
+
+    def flush(self):
+        """Levert een nog wachtend event direct af, bijv. voordat een klik wordt verwerkt"""
+        self.timer.stop()
+        if self.pending is not None:
+            event, self.pending = self.pending, None
+            self.last_time = time.perf_counter()
+            self.callback(event)
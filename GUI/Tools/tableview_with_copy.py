@@ -0,0 +1,119 @@
+import logging
+import os
+from datetime import datetime
+import numpy as np
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QMimeData, QUrl, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QTableView
+from Utils.config import Config
+
+
+class CopySignals(QObject):
+    """Signals van een CopyWorker, afgeleverd in de GUI-thread"""
+
+    finished = pyqtSignal(int, object, object)  # volgnummer, tekst of None, pad van het CSV-bestand of None
+    failed = pyqtSignal(int, str)  # volgnummer, foutmelding
+
+
+class CopyWorker(QRunnable):
+
+    def __init__(self, copy_id: int, model, rows: np.ndarray, columns: list[int], path: str | None, signals: CopySignals):
+        super().__init__()
+        self.copy_id = copy_id
+        self.model = model
+        self.rows = rows
+        self.columns = columns
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.path is None:
+                self.signals.finished.emit(self.copy_id, self.model.export(self.rows, self.columns), None)
+            else:
+                with open(self.path, 'w', encoding='utf-8', newline='') as file:
+                    file.write(self.model.export(self.rows, self.columns, separator=',', header=True))
+                self.signals.finished.emit(self.copy_id, None, self.path)
+        except Exception as err:
+            logging.exception("Copying the table selection failed")
+            self.signals.failed.emit(self.copy_id, str(err))
+
+
+class TableViewWithCopy(QTableView):
+    """
+    QTableView waarvan Ctrl+C de selectie als tab-gescheiden tekst naar het klembord kopieert. Het model moet
+    export(rows, columns, separator, header) bieden (zie ColumnsTableModel). Grote selecties worden op de achtergrond
+    geformatteerd; boven Config().get_copy_file_cells() cellen wordt de selectie als CSV-bestand gekopieerd.
+    """
+
+    c_SAMPLE_ROWS = 100  # rijen waarop de kolombreedtes worden geschat
+    c_MARGIN = 16
+
+    copy_message = pyqtSignal(str)  # voortgang en resultaat van een kopie, voor de statusbalk
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool()
+        self.copy_signals = CopySignals()
+        self.copy_signals.finished.connect(self.handle_copy_finished)
+        self.copy_signals.failed.connect(self.handle_copy_failed)
+        self.copy_id = 0
+
+    def keyPressEvent(self, event):
+        super().keyPressEvent(event)
+        if event.key() == Qt.Key.Key_C and (event.modifiers() & Qt.KeyboardModifier.ControlModifier):
+            self.copy_selection()
+
+    def get_selection(self) -> tuple[np.ndarray, list[int]]:
+        """De geselecteerde rijen en kolommen; bij een niet-rechthoekige selectie het omhullende blok"""
+        ranges = list(self.selectionModel().selection())
+        if not ranges:
+            return np.empty(0, dtype=np.int64), []
+        rows = np.unique(np.concatenate([np.arange(r.top(), r.bottom() + 1) for r in ranges]))
+        columns = sorted({column for r in ranges for column in range(r.left(), r.right() + 1)})
+        return rows, columns
+
+    def copy_selection(self):
+        rows, columns = self.get_selection()
+        n_cells = len(rows) * len(columns)
+        if n_cells == 0:
+            return
+        self.copy_id += 1
+        if n_cells <= Config().get_copy_background_cells():
+            QApplication.clipboard().setText(self.model().export(rows, columns))
+            return
+        path = None
+        if n_cells > Config().get_copy_file_cells():
+            os.makedirs(Config().getDataFilesPath(), exist_ok=True)
+            path = os.path.join(Config().getDataFilesPath(), f"selection_{datetime.now():%Y%m%d_%H%M%S}.csv")
+        self.copy_message.emit(f"Copying {len(rows)} rows x {len(columns)} columns ...")
+        self.thread_pool.start(CopyWorker(self.copy_id, self.model(), rows, columns, path, self.copy_signals))
+
+    def handle_copy_finished(self, copy_id: int, text: str | None, path: str | None):
+        if copy_id != self.copy_id:
+            return  # inmiddels is een nieuwere selectie gekopieerd
+        if path is None:
+            QApplication.clipboard().setText(text)
+            self.copy_message.emit("Selection copied")
+        else:
+            mime_data = QMimeData()
+            mime_data.setUrls([QUrl.fromLocalFile(os.path.abspath(path))])
+            mime_data.setText(os.path.abspath(path))
+            QApplication.clipboard().setMimeData(mime_data)
+            self.copy_message.emit(f"Selection too large for the clipboard, copied as CSV file {path}")
+
+    def handle_copy_failed(self, copy_id: int, message: str):
+        if copy_id == self.copy_id:
+            self.copy_message.emit(f"Copying the selection failed: {message}")
+
+    def resize_columns_to_sample(self):
+        """Als resizeColumnsToContents, maar op basis van een steekproef van de rijen in plaats van alle rijen"""
+        model = self.model()
+        n_rows = model.rowCount()
+        rows = sorted({round(i * (n_rows - 1) / (self.c_SAMPLE_ROWS - 1)) for i in range(self.c_SAMPLE_ROWS)}) if n_rows > 0 else []
+        metrics = self.fontMetrics()
+        header_metrics = self.horizontalHeader().fontMetrics()
+        for column in range(model.columnCount()):
+            header = model.headerData(column, Qt.Orientation.Horizontal) or ''
+            width = max([header_metrics.horizontalAdvance(header)] +
+                        [metrics.horizontalAdvance(model.data(model.index(row, column)) or '') for row in rows])
+            self.setColumnWidth(column, width + self.c_MARGIN)
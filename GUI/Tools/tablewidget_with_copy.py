@@ -1,23 +0,0 @@
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QApplication, QTableWidget
-
-
-class TableWidgetWithCopy(QTableWidget):
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-    def keyPressEvent(self, event):
-        super().keyPressEvent(event)
-        if event.key() == Qt.Key.Key_C and (event.modifiers() & Qt.KeyboardModifier.ControlModifier):
-            copied_cells = sorted(self.selectedIndexes())
-            copy_text = ''
-            max_column = copied_cells[-1].column()
-            for c in copied_cells:
-                copy_text += self.item(c.row(), c.column()).text()
-                if c.column() == max_column:
-                    copy_text += '\n'
-                else:
-                    copy_text += '\t'
-
-            QApplication.clipboard().setText(copy_text)
@@ -0,0 +1,88 @@
+import logging
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from Models.model import Model
+from Models.data_view import DataView
+
+
+class DataLoaderSignals(QObject):
+    """
+    Signals van de DataLoader. Ze worden vanuit de achtergrondthread verstuurd en in de GUI-thread afgeleverd.
+    Iedere load heeft een volgnummer, zodat resultaten van een geannuleerde load kunnen worden genegeerd.
+    """
+
+    progress = pyqtSignal(int, int, int)  # volgnummer, aantal data_stores klaar, totaal
+    finished = pyqtSignal(int, object, object)  # volgnummer, DataView, TransferInfo of None
+    failed = pyqtSignal(int, str)  # volgnummer, foutmelding
+
+
+class DataLoadWorker(QRunnable):
+
+    def __init__(self, load_id: int, model: Model, data_view: DataView, cancel_event: threading.Event,
+                 signals: DataLoaderSignals):
+        super().__init__()
+        self.load_id = load_id
+        self.model = model
+        self.data_view = data_view
+        self.cancel_event = cancel_event
+        self.signals = signals
+
+    def run(self):
+        try:
+            transfer_info = self.model.acquire_data(self.data_view, self.cancel_event,
+                                                    progress=lambda done, total: self.signals.progress.emit(self.load_id, done, total))
+        except Exception as err:
+            logging.exception(f"Loading {self.data_view.name} failed")
+            self.signals.failed.emit(self.load_id, str(err))
+            return
+        if not self.cancel_event.is_set():
+            self.signals.finished.emit(self.load_id, self.data_view, transfer_info)
+
+
+class DataLoader:
+    """
+    Laadt de data van een DataView op de achtergrond (ophalen, decoderen, eenheden, afgeleide signalen), zodat de
+    GUI-thread vrij blijft. Een nieuwe load annuleert de lopende; de callbacks worden alleen aangeroepen voor de
+    laatst gestarte load.
+    """
+
+    def __init__(self, on_finished, on_progress=None, on_failed=None):
+        self.thread_pool = QThreadPool()
+        self.signals = DataLoaderSignals()
+        self.load_id = 0
+        self.cancel_event: threading.Event | None = None
+        self.on_finished = on_finished
+        self.on_progress = on_progress
+        self.on_failed = on_failed
+        self.signals.finished.connect(self.handle_finished)
+        self.signals.progress.connect(self.handle_progress)
+        self.signals.failed.connect(self.handle_failed)
+
+    def load(self, model: Model, data_view: DataView):
+        self.cancel()
+        self.load_id += 1
+        self.cancel_event = threading.Event()
+        self.thread_pool.start(DataLoadWorker(self.load_id, model, data_view, self.cancel_event, self.signals))
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_event = None
+
+    def is_loading(self) -> bool:
+        return self.cancel_event is not None
+
+    def handle_finished(self, load_id: int, data_view: DataView, transfer_info):
+        if load_id == self.load_id:
+            self.cancel_event = None
+            self.on_finished(data_view, transfer_info)
+
+    def handle_progress(self, load_id: int, done: int, total: int):
+        if load_id == self.load_id and self.on_progress:
+            self.on_progress(done, total)
+
+    def handle_failed(self, load_id: int, message: str):
+        if load_id == self.load_id:
+            self.cancel_event = None
+            if self.on_failed:
+                self.on_failed(message)
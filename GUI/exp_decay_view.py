@@ -1,5 +1,5 @@
 import os
-from datetime import datetime
+import numpy as np
 from PyQt6.QtWidgets import QDialog
 from PyQt6 import uic
 import matplotlib.dates as mdates
@@ -21,8 +21,10 @@ class ExponentialDecayView(QDialog):
             if key == "fitButtonPressed":
                 self.ui.fitPushButton.clicked.connect(value)
 
-    def show_plot(self, coords: tuple[list[datetime], list[float]], title: str, ylabel: str, fit_coords: tuple[list[datetime], list[float]] | None = None):
+    def show_plot(self, coords: tuple[np.ndarray, list[float]], title: str, ylabel: str, fit_coords: tuple[np.ndarray, list[float]] | None = None):
+        """De tijden (coords[0], fit_coords[0]) zijn matplotlib date numbers"""
         self.ui.mpl_widget.canvas.ax.clear()
+        self.ui.mpl_widget.canvas.ax.xaxis_date()
         self.ui.mpl_widget.canvas.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(self.ui.mpl_widget.canvas.ax.xaxis.get_major_locator()))
         self.ui.mpl_widget.canvas.ax.plot(coords[0], coords[1], 'bo')
         self.ui.mpl_widget.canvas.ax.set_xlabel('time')
@@ -6,6 +6,9 @@ from Utils.config import Config
 from GUI.gui_view import GUIView
 from GUI.Tools.time_format import filename_fmt
 from Models.model import Model
+from Models.data_view import DataView
+from ServerRequests.server_requests import TransferInfo
+from GUI.data_loader import DataLoader
 from Models.data_store import c_LOCALFILE_ID
 from Algorithms.signal_shift import SignalShift
 from GUI.time_delay_controller import TimeDelayController
@@ -15,10 +18,12 @@ from GUI.exp_decay_controller import ExponentialDecayController
 class GUIController:
     """ Controller voor het main screen """
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
 
         self.view = GUIView()
-        self.model = Model()
+        self.model = Model(use_cache=use_cache)
+        self.data_loader = DataLoader(on_finished=self.data_loaded, on_progress=self.view.show_progress,
+                                      on_failed=self.data_load_failed)
         self.view.connectEvents(
             {
                 'settingsDeactivated': self.deactivateSettings,
@@ -77,7 +82,6 @@ class GUIController:
             signal_check_states = signal_check_states | signal_check_states_this_data_store if signal_check_states else signal_check_states_this_data_store
         self.view.show_signals_table(signal_check_states)
         self.acquire_and_show()
-        self.view.set_date_range(self.model.get_current_data_stores())
 
     def signalsTableChanged(self):
         for data_store in self.model.get_current_data_stores():
@@ -110,7 +114,7 @@ class GUIController:
                 shift_in_samples = signal_shift.assess_shift(data_store.data[Config().get_ref_shift_signal()],
                                                              kernel_size=Config().getCrossCorrKernelSize())
                 sampling_time = data_store.get_sampling_time()
-                TimeDelayController(signal_shift.cross_corr, shift_in_samples, sampling_time)
+                TimeDelayController(signal_shift.cross_corr, shift_in_samples, sampling_time, self.model.get_shift_info())
 
     def reload(self):
         self.apply_data_store(self.model.get_current_data_view().name)
@@ -121,7 +125,7 @@ class GUIController:
             logging.info(f"Created directory {path}")
         filename = datetime.now().strftime(filename_fmt)
         cnt = 0
-        while os.path.exists(full_file_name := os.path.abspath(os.path.join(path, filename + ".json"))):
+        while os.path.exists(full_file_name := os.path.abspath(os.path.join(path, filename + DataView.c_COLUMNS_EXTENSION))):
             cnt += 1
             if cnt == 1:  # First time
                 filename += f"_{cnt}"
@@ -147,10 +151,20 @@ class GUIController:
         self.view.show_data(Model.get_default_time_range(self.model.get_current_data_stores()), self.model.get_current_data_view())
 
     def acquire_and_show(self):
+        """Start het laden op de achtergrond; een nog lopende load (bijv. van een andere databron) wordt geannuleerd"""
         if data_view := self.model.get_current_data_view():
-            if transfer_info := self.model.acquire_data(data_view):
-                self.view.show_transfer_info(transfer_info)
-            for data_store in self.model.get_current_data_stores():
-                Model.handle_derived_data(data_store)
-            self.view.append_colors(Model.get_derived_colors())
+            self.view.show_progress(0, 0 if data_view.is_local_file() else len(data_view.get_data_stores()))
+            self.data_loader.load(self.model, data_view)
+
+    def data_loaded(self, data_view: DataView, transfer_info: TransferInfo | None):
+        self.view.hide_progress()
+        if transfer_info:
+            self.view.show_transfer_info(transfer_info)
+        self.view.append_colors(Model.get_derived_colors())
+        if data_view is self.model.get_current_data_view():
             self.view.show_data(Model.get_default_time_range(self.model.get_current_data_stores()), data_view)
+            self.view.set_date_range(self.model.get_current_data_stores())
+
+    def data_load_failed(self, message: str):
+        self.view.hide_progress()
+        self.view.show_status_message(f"Loading data failed: {message}")
@@ -3,7 +3,7 @@ from datetime import datetime
 from GUI.Tools.time_format import data_range_fmt
 from PyQt6 import uic
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QMainWindow, QTableWidgetItem, QMenu, QFileDialog, QStatusBar
+from PyQt6.QtWidgets import QMainWindow, QTableWidgetItem, QMenu, QFileDialog, QStatusBar, QProgressBar
 from Utils.config import Config
 from Utils.settings import Settings
 from GUI.plotter import Plotter
@@ -30,13 +30,18 @@ class GUIView(QMainWindow):
         self.ui = uic.loadUi(os.path.join(Config().getUiDirName(), Config().getMainScreenFileName()), self)
         self.actionCallbacks = {}
         self.plotter = Plotter(self.ui.mpl_widget)
-        self.table_view = TableView(self.ui.tableWidget)
+        self.table_view = TableView(self.ui.tableView)
+        self.ui.tableView.copy_message.connect(self.show_status_message)
         self.initialize()
 
     def initialize(self):
         self.setWindowTitle(f'{Config().getAppName()}  v.{Config().getVersion()}  (c) {Config().getAppInfo()}')
         self.ui.stackedWidget.setCurrentWidget(self.ui.plot)
         self.setStatusBar(QStatusBar())
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(160)
+        self.progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.progress_bar)
         # context menus
         self.ui.stackedWidget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.ui.stackedWidget.customContextMenuRequested.connect(self.show_graph_page_context_menu)
@@ -148,6 +153,7 @@ class GUIView(QMainWindow):
         if self.is_plotter_view():
             self.plotter.time_range = time_range
             self.plotter.data_view = data_view
+            self.plotter.prefetcher.clear()  # de data_stores zijn (opnieuw) geladen
             for data_store in data_view.get_data_stores():
                 self.plotter.set_signal_visibiities(Settings().get_checked_visibilities(data_store.name))
             self.plotter.update_plot()
@@ -223,3 +229,16 @@ class GUIView(QMainWindow):
 
     def show_transfer_info(self, transfer_info: TransferInfo):
         self.statusBar().showMessage(str(transfer_info))
+
+    def show_status_message(self, text: str):
+        self.statusBar().showMessage(text)
+
+    def show_progress(self, done: int, total: int):
+        """Voortgang van het laden; bij total 0 een bezig-indicator"""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat("Loading %v/%m")
+        self.progress_bar.setVisible(True)
+
+    def hide_progress(self):
+        self.progress_bar.setVisible(False)
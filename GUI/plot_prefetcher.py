@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from Models.data_store import DataStore
+from Models.data_view import DataView
+
+PlotData = dict[tuple[str, str], tuple[np.ndarray, np.ndarray]]  # (data_store, signal) naar date numbers en signaaldata
+
+
+class PlotPrefetcher:
+    """
+    Bereidt de plotdata van een DataView voor een tijdvenster voor: per lijn de gedecimeerde samples (zie
+    DataStore.get_plot_indices) met hun tijden als matplotlib date numbers. Resultaten worden bewaard in een LRU-cache
+    met sleutel (view, tijdvenster, resolutie); prefetch berekent ze alvast op de achtergrond voor de vensters die
+    waarschijnlijk volgen (pan, zoom). Een resultaat geldt alleen zolang de data van de data_stores niet is vervangen.
+    """
+
+    c_MAX_ENTRIES = 16
+
+    def __init__(self, max_entries: int = c_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.cache: OrderedDict[tuple, tuple[tuple, PlotData]] = OrderedDict()
+        self.pending: set[tuple] = set()
+        self.lock = threading.Lock()  # voor cache en pending; de caches van een data_store heeft DataStore zelf onder slot
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    @staticmethod
+    def key(data_view: DataView, time_range: tuple[float, float], max_points: int) -> tuple:
+        return id(data_view), time_range, max_points
+
+    @classmethod
+    def version(cls, data_view: DataView) -> tuple:
+        """De generaties van de data_stores (uniek over alle stores) en de geplotte signalen"""
+        return id(data_view), *((data_store.generation, tuple(cls.plotted_signals(data_view, data_store)) if data_store.data else ())
+                                for data_store in data_view.get_data_stores())
+
+    @staticmethod
+    def plotted_signals(data_view: DataView, data_store: DataStore) -> list[str]:
+        return [item for item in data_store.data if item in data_view.get_signals(data_store) and
+                item != DataStore.c_TIMESTAMP_ID]
+
+    def get(self, data_view: DataView, time_range: tuple[float, float], max_points: int) -> PlotData:
+        """De plotdata uit de cache, of direct berekend"""
+        key = self.key(data_view, time_range, max_points)
+        version = self.version(data_view)
+        with self.lock:
+            if (entry := self.cache.get(key)) is not None and entry[0] == version:
+                self.cache.move_to_end(key)
+                return entry[1]
+        plot_data = self.prepare(data_view, time_range, max_points)
+        self.store(key, version, plot_data)
+        return plot_data
+
+    def prefetch(self, data_view: DataView, time_ranges: list[tuple[float, float]], max_points: int):
+        version = self.version(data_view)
+        for time_range in time_ranges:
+            key = self.key(data_view, time_range, max_points)
+            with self.lock:
+                if key in self.pending or ((entry := self.cache.get(key)) is not None and entry[0] == version):
+                    continue
+                self.pending.add(key)
+            self.executor.submit(self.run, data_view, time_range, max_points, key, version)
+
+    def run(self, data_view: DataView, time_range: tuple[float, float], max_points: int, key: tuple, version: tuple):
+        try:
+            self.store(key, version, self.prepare(data_view, time_range, max_points))
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+    def clear(self):
+        """Verwijdert alle resultaten, bijv. nadat de data_stores opnieuw zijn geladen"""
+        with self.lock:
+            self.cache.clear()
+
+    def store(self, key: tuple, version: tuple, plot_data: PlotData):
+        with self.lock:
+            self.cache[key] = (version, plot_data)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def prepare(self, data_view: DataView, time_range: tuple[float, float], max_points: int) -> PlotData:
+        plot_data = {}
+        for data_store in data_view.get_data_stores():
+            if data_store and data_store.data and (i_range := data_store.get_time_slice(time_range)):
+                date_numbers = data_store.get_date_numbers()
+                for signal in self.plotted_signals(data_view, data_store):
+                    i_plot = data_store.get_plot_indices(signal, i_range, max_points)
+                    plot_data[(data_store.name, signal)] = (date_numbers[i_plot], data_store.data[signal].data[i_plot])
+        return plot_data
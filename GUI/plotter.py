@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import matplotlib.dates as mdates
 from matplotlib.lines import Line2D
 from matplotlib.container import BarContainer
@@ -6,14 +6,18 @@ from matplotlib.patches import Rectangle
 from matplotlib import backend_bases
 import mplcursors
 from GUI.Tools.mplwidget import MplWidget
+from GUI.Tools.blit_manager import BlitManager, EventThrottle
+from GUI.plot_prefetcher import PlotPrefetcher
 from Utils.config import Config
 from Models.data_store import DataStore
 from Models.data_view import DataView, PlotRepresentation
-from Algorithms.binary_search import interval_to_range
 from Utils.unit_standardizer import UnitStandardizer
 
 
 class Plotter:
+
+    c_POINTS_PER_PIXEL = 2  # een minimum en een maximum per pixelkolom
+    c_BAR_WIDTH = 30 / (24 * 60)  # een half uur, in dagen (date numbers)
     
     def __init__(self, mpl_widget: MplWidget):
         self.mpl_widget: MplWidget = mpl_widget
@@ -24,17 +28,22 @@ class Plotter:
         self.time_range = None  # tuple (start, end) of current plot
         self.signal_visibilities: dict[str, bool] | None = None  # Dict mapping signal name to on/off status
         self.lines: dict[str, Line2D] = {}  # Dict mapping legend text to line, enabling hiding/showing
+        self.artists: dict[tuple[str, str], Line2D] = {}  # (data_store, signal) naar lijn, voor hergebruik bij pan/zoom
+        self.plot_key: tuple | None = None  # zie get_plot_key
         self.span_rect = [None, None]
         self.aspan: Rectangle | None = None
         self.cursor = None
         self.twin_axes = None
+        self.overlay = BlitManager(self.mpl_widget.canvas)  # selectie en cursor-annotaties, getekend met blitting
+        self.motion_throttle = EventThrottle(self.on_mouse_event)  # muisbewegingen ten hoogste eens per schermverversing
+        self.prefetcher = PlotPrefetcher()  # plotdata van de vensters na pan en zoom, alvast op de achtergrond
         self.connect_mpl_events()
 
     def connect_mpl_events(self):
         self.mpl_widget.canvas.mpl_connect('pick_event', self.on_pick_legend_text)
         self.mpl_widget.canvas.mpl_connect('button_press_event', self.on_mouse_event)
         self.mpl_widget.canvas.mpl_connect('button_release_event', self.on_mouse_event)
-        self.mpl_widget.canvas.mpl_connect('motion_notify_event', self.on_mouse_event)
+        self.mpl_widget.canvas.mpl_connect('motion_notify_event', self.motion_throttle)
         self.mpl_widget.canvas.mpl_connect('scroll_event', self.on_mouse_scroll_event)
 
     def set_visibility_change_notifier(self, visibility_change_notifier):
@@ -47,7 +56,56 @@ class Plotter:
         self.redraw_notifier = redraw_notifier
 
     def update_plot(self):
+        """
+        Werkt de plot bij voor de huidige time_range. Zolang de signalen en eenheden niet veranderen, worden de bestaande
+        lijnen hergebruikt (set_data); anders worden de assen, lijnen, legenda en cursor opnieuw opgebouwd.
+        """
+        if self.plot_key is None or self.plot_key != self.get_plot_key() or not self.refresh_plot():
+            self.rebuild_plot()
+            self.plot_key = self.get_plot_key()
+        if self.data_view.plot_representation != PlotRepresentation.BAR:
+            self.prefetch_neighbours()
+
+    def prefetch_neighbours(self):
+        """Bereidt de plotdata voor van de vensters na een pan naar links of rechts en na uitzoomen"""
+        data_stores = self.data_view.get_data_stores()
+        if all(data_store.data for data_store in data_stores):
+            time_ranges = [self.constrain_timerange(data_stores, *self.pan_range(-1), keep_range=True),
+                           self.constrain_timerange(data_stores, *self.pan_range(1), keep_range=True),
+                           self.constrain_timerange(data_stores, *self.zoom_range(2.0))]
+            self.prefetcher.prefetch(self.data_view, [time_range for time_range in time_ranges
+                                                      if time_range is not None and time_range != self.time_range],
+                                     self.get_max_plot_points())
+
+    def get_plot_key(self) -> tuple:
+        return (id(self.data_view), self.data_view.plot_representation,
+                tuple((data_store.name, tuple((signal, data_store.data[signal].unit) for signal in self.get_plotted_signals(data_store)))
+                      for data_store in self.data_view.get_data_stores() if data_store and data_store.data))
+
+    def get_plotted_signals(self, data_store: DataStore) -> list[str]:
+        return PlotPrefetcher.plotted_signals(self.data_view, data_store)
+
+    def refresh_plot(self) -> bool:
+        """Zet de data van de bestaande lijnen voor de huidige time_range; False als opnieuw opbouwen nodig is"""
+        if self.data_view.plot_representation == PlotRepresentation.BAR:
+            return False
+        plot_data = self.prefetcher.get(self.data_view, self.time_range, self.get_max_plot_points())
+        if plot_data.keys() != self.artists.keys():
+            return False
+        self.release_cursor()
+        for line_key, (time_data, signal_data) in plot_data.items():
+            self.artists[line_key].set_data(time_data, signal_data)
+        for ax in [self.mpl_widget.canvas.ax] + (self.twin_axes or []):
+            ax.relim()
+            ax.autoscale_view()
+        self.mpl_widget.canvas.draw_idle()
+        if self.redraw_notifier:
+            self.redraw_notifier()
+        return True
+
+    def rebuild_plot(self):
         lines = []  # the line plots
+        self.artists = {}
         self.mpl_widget.canvas.ax.clear()
         self.mpl_widget.canvas.ax.set_xlabel('time')
         units = None
@@ -76,23 +134,28 @@ class Plotter:
                         self.twin_axes[i_unit - 1].clear()  # kennelijk nodig omdat anders problemen optreden bij bijv. zooming
                     self.twin_axes[i_unit - 1].set_ylabel(f"{UnitStandardizer().get_quantity(unit)} [{unit}]")
                     axes_signals = axes_signals | {signal.name: self.twin_axes[i_unit - 1] for signal in units[unit]}
+        self.mpl_widget.canvas.ax.xaxis_date()  # de tijden worden als date numbers geplot
         self.mpl_widget.canvas.ax.xaxis.set_major_formatter(
             mdates.ConciseDateFormatter(self.mpl_widget.canvas.ax.xaxis.get_major_locator()))
         for data_store in self.data_view.get_data_stores():
             if data_store and data_store.data and (t := data_store.data[DataStore.c_TIMESTAMP_ID]):
-                if i_range := interval_to_range(t.data, self.time_range[0], self.time_range[1]):
-                    time_data = [datetime.fromtimestamp(data_store.data[DataStore.c_TIMESTAMP_ID][idx]) for idx in i_range]
-                    signals = [item for item in data_store.data if item in self.data_view.get_signals(data_store) and
-                               item != DataStore.c_TIMESTAMP_ID]
-                    for signal in signals:
+                if i_range := data_store.get_time_slice(self.time_range):
+                    max_points = self.get_max_plot_points()
+                    for signal in self.get_plotted_signals(data_store):
                         try:
                             ax = axes_signals[signal] if signal in axes_signals else self.mpl_widget.canvas.ax  # de else heeft betrekking op derived signals
-                            signal_data = [data_store.data[signal][idx] for idx in i_range]
                             if self.data_view.plot_representation == PlotRepresentation.BAR:
-                                line_plot = ax.bar(time_data, signal_data, color=self.colors[signal], label=signal, width=timedelta(minutes=30))
+                                i_plot = i_range
+                            else:  # lange reeksen teruggebracht tot de minima en maxima per pixelkolom
+                                i_plot = data_store.get_plot_indices(signal, i_range, max_points)
+                            time_data = data_store.get_date_numbers()[i_plot]
+                            signal_data = data_store.data[signal].data[i_plot]
+                            if self.data_view.plot_representation == PlotRepresentation.BAR:
+                                line_plot = ax.bar(time_data, signal_data, color=self.colors[signal], label=signal, width=self.c_BAR_WIDTH)
                             else:
                                 line_plot, = ax.plot(time_data, signal_data, color=self.colors[signal], label=signal,
                                                      marker='o' if signal in Config().getSymbolPlotSignals() else '')
+                                self.artists[(data_store.name, signal)] = line_plot
                             lines.append(line_plot)
                         except KeyError:
                             print(f"Error {signal}")
@@ -116,10 +179,16 @@ class Plotter:
         if self.cursor:
             self.cursor.remove()
         self.cursor = mplcursors.cursor(lines, multiple=False)
+        self.cursor.connect("add", lambda selection: self.overlay.add_artist(selection.annotation))
+        self.cursor.connect("remove", lambda selection: self.overlay.remove_artist(selection.annotation))
         self.mpl_widget.canvas.draw()
         if self.redraw_notifier:
             self.redraw_notifier()
 
+    def get_max_plot_points(self) -> int:
+        """Maximaal aantal punten per lijn, naar de breedte van de as in pixels"""
+        return max(int(self.c_POINTS_PER_PIXEL * self.mpl_widget.canvas.ax.get_window_extent().width), 100)
+
     def on_pick_legend_text(self, event):
         # On the pick event, find the original line corresponding to the legend
         # proxy line, and toggle its visibility.
@@ -135,35 +204,38 @@ class Plotter:
             pass  # no artist
 
     def on_mouse_event(self, event):
+        if self.data_view is None:
+            return  # de eerste load loopt nog: er is niets om te pannen of te selecteren
+        if event.name != 'motion_notify_event':
+            self.motion_throttle.flush()  # eerst de laatste muisbeweging verwerken
         if legend := (self.twin_axes[0].get_legend() if self.twin_axes else self.mpl_widget.canvas.ax.get_legend()):
             if not legend.get_window_extent().contains(event.x, event.y):
                 if event.name == 'button_press_event' and event.button == backend_bases.MouseButton.LEFT:
                     x_range = self.mpl_widget.canvas.ax.dataLim.xmax - self.mpl_widget.canvas.ax.dataLim.xmin
                     if event.xdata < self.mpl_widget.canvas.ax.dataLim.xmin + Config().getPanPlotRelativePosition() * x_range:
-                        delta_x = 0.5 * x_range
-                        time_range_start = mdates.num2date(self.mpl_widget.canvas.ax.dataLim.xmin - delta_x)
-                        time_range_end = mdates.num2date(self.mpl_widget.canvas.ax.dataLim.xmax - delta_x)
-                        if self.update_timerange(self.data_view.get_data_stores(), time_range_start, time_range_end, keep_range=True):
-                            self.update_plot()
+                        direction = -1
                     elif event.xdata > self.mpl_widget.canvas.ax.dataLim.xmax - Config().getPanPlotRelativePosition() * x_range:
-                        delta_x = 0.5 * x_range
-                        time_range_start = mdates.num2date(self.mpl_widget.canvas.ax.dataLim.xmin + delta_x)
-                        time_range_end = mdates.num2date(self.mpl_widget.canvas.ax.dataLim.xmax + delta_x)
-                        if self.update_timerange(self.data_view.get_data_stores(), time_range_start, time_range_end, keep_range=True):
-                            self.update_plot()
+                        direction = 1
                     else:
                         self.span_rect[0] = event.xdata
+                        return
+                    if self.set_time_range(self.constrain_timerange(self.data_view.get_data_stores(), *self.pan_range(direction), keep_range=True)):
+                        self.update_plot()
                 elif event.name == 'motion_notify_event':
                     self.release_cursor()
-                    if self.span_rect[0] is not None:
+                    if self.span_rect[0] is not None and event.xdata is not None:
                         self.span_rect[1] = event.xdata
-                        if self.aspan:
-                            self.aspan.remove()
-                        self.aspan = self.mpl_widget.canvas.ax.axvspan(self.span_rect[0], self.span_rect[1],
-                                                                       color='red',
-                                                                       alpha=Config().getSelectionTranslucency())
-                        self.mpl_widget.canvas.draw()
+                        if self.aspan is None:
+                            self.aspan = self.mpl_widget.canvas.ax.axvspan(self.span_rect[0], self.span_rect[1],
+                                                                           color='red',
+                                                                           alpha=Config().getSelectionTranslucency())
+                            self.overlay.add_artist(self.aspan)
+                        else:
+                            self.aspan.set_x(min(self.span_rect))
+                            self.aspan.set_width(abs(self.span_rect[1] - self.span_rect[0]))
+                        self.overlay.update()
                 elif event.name == 'button_release_event' and event.button == backend_bases.MouseButton.LEFT:
+                    redrawn = False
                     if self.release_cursor() is True:
                         self.span_rect[0] = None
                     elif self.span_rect[0] is not None and self.span_rect[1] is not None:
@@ -172,27 +244,34 @@ class Plotter:
                             time_range_end = mdates.num2date(max(self.span_rect))
                             if self.update_timerange(self.data_view.get_data_stores(), time_range_start, time_range_end, force_range=True):
                                 self.update_plot()
+                                redrawn = True
                         except TypeError:  # mogelijk zijn er None-waarden in span_rect
                             pass
                     if self.aspan:
-                        self.aspan.remove()
+                        self.overlay.remove_artist(self.aspan)
+                        if self.aspan.axes is not None:  # niet al verwijderd bij het opnieuw opbouwen van de plot
+                            self.aspan.remove()
                         self.aspan = None
+                        if not redrawn:
+                            self.overlay.update()  # de selectie wissen
                     self.span_rect = [None, None]
 
     def on_mouse_scroll_event(self, event):
-        xmin = self.mpl_widget.canvas.ax.dataLim.xmin
-        xmax = self.mpl_widget.canvas.ax.dataLim.xmax
-        if self.twin_axes:
-            for twin_axis in self.twin_axes:
-                xmin = min(xmin, twin_axis.dataLim.xmin)
-                xmax = max(xmax, twin_axis.dataLim.xmax)
-        range = (2.0 if event.step > 0 else 0.5) * (xmax - xmin)
-        center = (self.mpl_widget.canvas.ax.dataLim.xmin + self.mpl_widget.canvas.ax.dataLim.xmax) / 2.0
-        time_range_start = mdates.num2date(center - range / 2.0)
-        time_range_end = mdates.num2date(center + range / 2.0)
-        if self.update_timerange(self.data_view.get_data_stores(), time_range_start, time_range_end):
+        if self.data_view is None:
+            return  # de eerste load loopt nog: er is niets om te zoomen
+        if self.set_time_range(self.constrain_timerange(self.data_view.get_data_stores(), *self.zoom_range(2.0 if event.step > 0 else 0.5))):
             self.update_plot()
 
+    def pan_range(self, direction: int) -> tuple[float, float]:
+        """Het venster een halve breedte naar links (direction -1) of rechts (1) verschoven"""
+        shift = direction * 0.5 * (self.time_range[1] - self.time_range[0])
+        return self.time_range[0] + shift, self.time_range[1] + shift
+
+    def zoom_range(self, factor: float) -> tuple[float, float]:
+        center = (self.time_range[0] + self.time_range[1]) / 2.0
+        half_range = factor * (self.time_range[1] - self.time_range[0]) / 2.0
+        return center - half_range, center + half_range
+
     def release_cursor(self) -> bool:
         if len(self.cursor.selections) > 0:
             self.cursor.remove_selection(self.cursor.selections[0])
@@ -209,22 +288,26 @@ class Plotter:
         - de range wordt begrensd volgens de geconfigureerde waarde, tenzij force_range is True. In gebruik bij selectie.
         - als de range-begrenzing aangrijpt is er een uitzondering bij vergroten van de range.
         """
-        req_time_range = time_range_end - time_range_start
-        actual_time_range = datetime.fromtimestamp(self.time_range[1]) - datetime.fromtimestamp(self.time_range[0])
+        return self.set_time_range(self.constrain_timerange(data_stores, datetime.timestamp(time_range_start.replace(tzinfo=None)),
+                                                            datetime.timestamp(time_range_end.replace(tzinfo=None)),
+                                                            keep_range, force_range))
+
+    def constrain_timerange(self, data_stores: list[DataStore], start_time: float, end_time: float,
+                            keep_range: bool = False, force_range: bool = False) -> tuple[float, float] | None:
+        """De time_range volgens de regels van update_timerange, zonder hem te zetten; None als hij ongewijzigd blijft"""
+        req_time_range = end_time - start_time
+        orig_time_range = self.time_range[1] - self.time_range[0]
         max_time = min(data_store.end_timestamp for data_store in data_stores)
         min_time = max(data_store.start_timestamp for data_store in data_stores)
-        if req_time_range < timedelta(minutes=Config().getMinPlottedTimeRangeInMinutes()):
+        min_plotted_time_range = 60.0 * Config().getMinPlottedTimeRangeInMinutes()
+        if req_time_range < min_plotted_time_range:
             if force_range is False:
-                if keep_range is False and req_time_range <= actual_time_range:
-                    return
+                if keep_range is False and req_time_range <= orig_time_range:
+                    return None
             else:
-                avail_time_range = min(timedelta(minutes=Config().getMinPlottedTimeRangeInMinutes()),
-                                       datetime.fromtimestamp(max_time) - datetime.fromtimestamp(min_time))
-                time_range_start -= (avail_time_range - req_time_range) / 2
-                time_range_end += (avail_time_range - req_time_range) / 2
-        start_time = datetime.timestamp(time_range_start.replace(tzinfo=None))
-        end_time = datetime.timestamp(time_range_end.replace(tzinfo=None))
-        orig_time_range = self.time_range[1] - self.time_range[0]
+                avail_time_range = min(min_plotted_time_range, max_time - min_time)
+                start_time -= (avail_time_range - req_time_range) / 2
+                end_time += (avail_time_range - req_time_range) / 2
         if end_time > max_time:
             end_time = max_time
             if keep_range is True:
@@ -233,12 +316,13 @@ class Plotter:
             start_time = min_time
             if keep_range is True:
                 end_time = min_time + orig_time_range
-        prev_time_range = self.time_range
-        self.time_range = (start_time, end_time)
-        if prev_time_range != self.time_range:
-            return True
-        else:
+        return start_time, end_time
+
+    def set_time_range(self, time_range: tuple[float, float] | None) -> bool:
+        if time_range is None or time_range == self.time_range:
             return False
+        self.time_range = time_range
+        return True
 
     def switch_visible(self, legend_text, visible):
         mpl_object = self.lines[legend_text]
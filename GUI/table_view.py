@@ -1,29 +1,112 @@
-from datetime import datetime
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFont
+from Models.data_store import DataStore
 from Models.data_view import DataView
-from PyQt6.QtWidgets import QTableWidgetItem
-from GUI.Tools.tablewidget_with_copy import TableWidgetWithCopy
+from Algorithms.date_numbers import timestamps_to_local_strings
+from GUI.Tools.tableview_with_copy import TableViewWithCopy
+
+
+class ColumnsTableModel(QAbstractTableModel):
+    """
+    Tabelmodel over kolommen van gelijke lengte. Er worden geen items per cel aangemaakt: data() formatteert alleen de
+    cellen die de view opvraagt, dus alleen de zichtbare rijen. De kolom met time_column bevat timestamps.
+    """
+
+    def __init__(self, headers: list[str], columns: list[np.ndarray], time_column: int = 0):
+        super().__init__()
+        self.headers = headers
+        self.columns = columns
+        self.time_column = time_column
+        self.n_rows = len(columns[0]) if columns else 0
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.n_rows
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self.format(index.row(), index.column())
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return self.headers[section]
+            if role == Qt.ItemDataRole.FontRole:
+                font = QFont()
+                font.setBold(True)
+                return font
+        return super().headerData(section, orientation, role)
+
+    def format(self, row: int, column: int) -> str:
+        return str(self.format_cells(np.array([row]), column)[0])
+
+    def format_cells(self, rows: np.ndarray, column: int) -> np.ndarray:
+        """
+        De cellen rows van column als tekst, gevectoriseerd; de tabel en export() tonen dus dezelfde tekst. Een
+        timestamp als str(datetime.fromtimestamp(t)), een waarde als str(value); ontbrekende waarden blijven leeg.
+        """
+        values = self.columns[column][rows]
+        missing = np.isnan(values)
+        if column == self.time_column:
+            texts = np.full(len(values), '', dtype=object)
+            texts[~missing] = timestamps_to_local_strings(values[~missing])
+            return texts
+        return np.where(missing, '', values.astype(str))
+
+    def export(self, rows: np.ndarray, columns: list[int], separator: str = '\t', header: bool = False) -> str:
+        """
+        De cellen rows x columns als tekst met separator tussen de kolommen, per kolom geformatteerd met format_cells
+        en in een keer samengevoegd.
+        """
+        texts = [self.format_cells(rows, column) for column in columns]
+        lines = map(separator.join, zip(*texts))
+        if header:
+            lines = [separator.join(self.headers[column] for column in columns), *lines]
+        return '\n'.join(lines) + '\n'
 
 
 class TableView:
 
-    def __init__(self, tablewidget_with_copy: TableWidgetWithCopy):
-        self.tablewidget_with_copy: TableWidgetWithCopy = tablewidget_with_copy
+    def __init__(self, tableview_with_copy: TableViewWithCopy):
+        self.tableview_with_copy: TableViewWithCopy = tableview_with_copy
+
+    @staticmethod
+    def join_on_time(data_stores: list[DataStore]) -> tuple[list[str], list[np.ndarray]]:
+        """
+        De kolommen van data_stores samengevoegd op tijd: de eerste kolom bevat alle timestamps van de data_stores,
+        een data_store zonder sample op een timestamp krijgt daar NaN. Bij een enkele data_store blijven de kolommen
+        ongewijzigd (geen kopie), behalve een afgeleid signaal dat nog niet is aangevuld: dat wordt met NaN verlengd.
+        """
+        data_stores = [data_store for data_store in data_stores if data_store and data_store.data]
+        if not data_stores:
+            return [], []
+        if len(data_stores) == 1:
+            data = data_stores[0].data
+            names = [DataStore.c_TIMESTAMP_ID] + [name for name in data if name != DataStore.c_TIMESTAMP_ID]
+            n_rows = len(data[DataStore.c_TIMESTAMP_ID].data)
+            return names, [data[name].data if len(data[name].data) == n_rows  # een afgeleid signaal kan korter zijn
+                           else np.concatenate((data[name].data, np.full(n_rows - len(data[name].data), np.nan)))
+                           for name in names]
+        timestamps = np.unique(np.concatenate([data_store.data[DataStore.c_TIMESTAMP_ID].data for data_store in data_stores]))
+        headers, columns = [DataStore.c_TIMESTAMP_ID], [timestamps]
+        for data_store in data_stores:
+            store_timestamps = data_store.data[DataStore.c_TIMESTAMP_ID].data
+            positions = np.minimum(np.searchsorted(store_timestamps, timestamps), len(store_timestamps) - 1)
+            present = store_timestamps[positions] == timestamps
+            for name, signal in data_store.data.items():
+                if name != DataStore.c_TIMESTAMP_ID:
+                    values = signal.data
+                    valid = present & (positions < len(values))  # een afgeleid signaal kan korter zijn
+                    headers.append(f"{data_store.name}: {name}")
+                    columns.append(np.where(valid, values[np.minimum(positions, len(values) - 1)], np.nan)
+                                   if len(values) else np.full(len(timestamps), np.nan))
+        return headers, columns
 
     def show_data(self, data_view: DataView):
-        assert len(data_view.get_data_stores()) == 1
-        for data_store in data_view.get_data_stores():
-            self.tablewidget_with_copy.setColumnCount(len(data_store.data))
-            for col, data_item in enumerate(data_store.data):
-                header_item = QTableWidgetItem(data_item)
-                font = header_item.font()
-                font.setBold(True)
-                header_item.setFont(font)
-                self.tablewidget_with_copy.setHorizontalHeaderItem(col, header_item)
-            lengths = [len(values) for values in data_store.data.values()]
-            assert all([length == lengths[0] for length in lengths])
-            self.tablewidget_with_copy.setRowCount(lengths[0])
-            for col, data_item in enumerate(data_store.data):
-                for row, value in enumerate(data_store.data[data_item]):
-                    value_repr = datetime.fromtimestamp(value) if data_item == 'timestamp' else str(value)
-                    self.tablewidget_with_copy.setItem(row, col, QTableWidgetItem(str(value_repr)))
-        self.tablewidget_with_copy.resizeColumnsToContents()
+        headers, columns = self.join_on_time(data_view.get_data_stores())
+        self.tableview_with_copy.setModel(ColumnsTableModel(headers, columns))
+        self.tableview_with_copy.resize_columns_to_sample()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from Models.data_store import DataStore
+from Utils.config import Config
+
+
+class DataCache:
+    """
+    Lokale cache van de data van data_stores, onder <datafiles>/cache. Per (server, data_store, signalen) is er een map
+    met per kolom een append-only bestand van float64 samples en een manifest.json met de eenheden, het aantal
+    geldige samples en de versie van de kolombestanden. Het manifest wordt als laatste geschreven; samples voorbij de
+    lengte in het manifest tellen niet. Kolommen worden met numpy.memmap geopend, zodat alleen het gebruikte deel van
+    de historie wordt ingelezen. Omdat geladen kolommen nog in gebruik kunnen zijn, worden ze nooit ingekort of
+    vervangen: een gewijzigde historie komt in bestanden met een nieuwe versie, waarna het manifest wordt omgezet.
+    Als de totale omvang max_size overschrijdt, worden de langst niet gebruikte data_stores verwijderd.
+    """
+
+    c_MANIFEST = "manifest.json"
+    lock = threading.Lock()  # data_stores worden parallel opgehaald
+
+    def __init__(self, path: str | None = None, max_size: int | None = None):
+        self.path = path if path is not None else os.path.join(Config().getDataFilesPath(), "cache")
+        self.max_size = max_size if max_size is not None else Config().get_cache_max_size()
+
+    def entry_path(self, server: str, data_store: DataStore) -> str:
+        key = json.dumps([server, data_store.name, sorted(data_store.signals)])
+        return os.path.join(self.path, f"{data_store.name}_{hashlib.sha1(key.encode()).hexdigest()[:12]}")
+
+    @staticmethod
+    def column_file(entry_path: str, column: str, version: int = 0) -> str:
+        return os.path.join(entry_path, f"{column}.f64" if version == 0 else f"{column}.{version}.f64")
+
+    @classmethod
+    def read_manifest(cls, entry_path: str) -> dict | None:
+        try:
+            with open(os.path.join(entry_path, cls.c_MANIFEST)) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @classmethod
+    def write_manifest(cls, entry_path: str, manifest: dict):
+        temp_file = os.path.join(entry_path, cls.c_MANIFEST + ".tmp")
+        with open(temp_file, "w") as file:
+            json.dump(manifest, file)
+        os.replace(temp_file, os.path.join(entry_path, cls.c_MANIFEST))
+
+    def load(self, server: str, data_store: DataStore) -> dict[str, np.ndarray | dict] | None:
+        """De gecachte data in het formaat van ServerRequests.get_data, of None"""
+        with self.lock:
+            entry_path = self.entry_path(server, data_store)
+            if (manifest := self.read_manifest(entry_path)) is None or manifest["length"] == 0:
+                return None
+            try:
+                data = {column: np.memmap(self.column_file(entry_path, column, manifest.get("version", 0)), dtype=np.float64, mode="r",
+                                          shape=(manifest["length"],))
+                        for column in [DataStore.c_TIMESTAMP_ID] + list(manifest["units"])}
+            except (FileNotFoundError, ValueError) as err:
+                logging.debug(f"Cache of {data_store.name} is invalid: {err}")
+                shutil.rmtree(entry_path, ignore_errors=True)
+                return None
+            manifest["last_used"] = time.time()
+            self.write_manifest(entry_path, manifest)
+        logging.debug(f"Loaded {manifest['length']} samples of {data_store.name} from cache")
+        return data | {"units": manifest["units"]}
+
+    def store(self, server: str, data_store: DataStore):
+        """Schrijft de (niet afgeleide) kolommen van data_store weg; alleen wat nog niet in de cache staat wordt toegevoegd"""
+        if not data_store.data or not data_store.signals:
+            return
+        timestamps = data_store.get_time_signal().data
+        columns = {DataStore.c_TIMESTAMP_ID: timestamps} | {signal: data_store.get_signal(signal).data for signal in data_store.signals}
+        units = {signal: data_store.get_signal(signal).unit for signal in data_store.signals}
+        with self.lock:
+            entry_path = self.entry_path(server, data_store)
+            manifest = self.read_manifest(entry_path)
+            version = manifest.get("version", 0) if manifest is not None else 0
+            n_cached = 0
+            if manifest is not None and manifest["units"] == units and 0 < manifest["length"] <= len(timestamps):
+                cached_timestamps = np.memmap(self.column_file(entry_path, DataStore.c_TIMESTAMP_ID, version), dtype=np.float64, mode="r",
+                                              shape=(manifest["length"],))
+                if cached_timestamps[0] == timestamps[0] and cached_timestamps[-1] == timestamps[manifest["length"] - 1]:
+                    n_cached = manifest["length"]  # de historie is ongewijzigd, alleen de staart toevoegen
+                del cached_timestamps
+            os.makedirs(entry_path, exist_ok=True)
+            if n_cached > 0:
+                try:
+                    for column, values in columns.items():
+                        with open(self.column_file(entry_path, column, version), "r+b") as file:
+                            if os.fstat(file.fileno()).st_size != n_cached * 8:
+                                file.truncate(n_cached * 8)  # samples na de lengte in het manifest zijn van een afgebroken schrijfactie
+                            file.seek(n_cached * 8)
+                            file.write(np.ascontiguousarray(values[n_cached:], dtype="<f8").data)
+                except OSError as err:  # bijv. inkorten van een bestand dat (op Windows) nog is gemapt
+                    logging.debug(f"Appending to the cache of {data_store.name} failed, rewriting it: {err}")
+                    n_cached = 0
+            if n_cached == 0:
+                version += 1  # nieuwe bestanden, want de oude kunnen nog als memmap in gebruik zijn
+                for column, values in columns.items():
+                    with open(self.column_file(entry_path, column, version), "wb") as file:
+                        file.write(np.ascontiguousarray(values, dtype="<f8").data)
+            self.write_manifest(entry_path, {"name": data_store.name, "server": server, "units": units,
+                                             "length": len(timestamps), "version": version, "last_used": time.time()})
+            self.remove_old_versions(entry_path, [os.path.basename(self.column_file(entry_path, column, version)) for column in columns])
+            self.evict(keep=entry_path)
+
+    @staticmethod
+    def remove_old_versions(entry_path: str, current_files: list[str]):
+        """Verwijdert kolombestanden van eerdere versies; wat nog in gebruik is (Windows) volgt bij een volgende store"""
+        for name in os.listdir(entry_path):
+            if name.endswith(".f64") and name not in current_files:
+                try:
+                    os.remove(os.path.join(entry_path, name))
+                except OSError:
+                    pass
+
+    def evict(self, keep: str | None = None):
+        entries = []
+        for name in os.listdir(self.path):
+            entry_path = os.path.join(self.path, name)
+            if os.path.isdir(entry_path):
+                size = sum(os.path.getsize(os.path.join(entry_path, file)) for file in os.listdir(entry_path))
+                last_used = (self.read_manifest(entry_path) or {}).get("last_used", 0.0)
+                entries.append((last_used, size, entry_path))
+        total_size = sum(size for _, size, _ in entries)
+        for last_used, size, entry_path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if entry_path != keep:
+                shutil.rmtree(entry_path, ignore_errors=True)
+                total_size -= size
+                logging.debug(f"Evicted {entry_path} from cache")
@@ -1,8 +1,18 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import ClassVar
+import itertools
+import math
+import threading
+import numpy as np
 from Models.signal import Signal
-from Algorithms.binary_search import interval_to_range
+from Algorithms.binary_search import interval_to_slice
+from Algorithms.chunk_stats import ChunkIndex, ChunkStats, RangeStats
+from Algorithms.min_max_pyramid import MinMaxPyramid
+from Algorithms.date_numbers import timestamps_to_date_numbers
+from Algorithms.energy_index import EnergyIndex
+from Algorithms.derived_signal import DerivedSignal
+from Algorithms.gap_fill import last_common_valid_index
 from Utils.unit_standardizer import UnitStandardizer
 
 
@@ -13,6 +23,7 @@ c_LOCALFILE_ID = "Local_file"
 class DataStore:
 
     c_TIMESTAMP_ID: ClassVar[str] = "timestamp"
+    generations: ClassVar[itertools.count] = itertools.count(1)  # gedeeld door alle stores, dus nooit hergebruikt
 
     name: str
     database: str  # Bij local file wordt dit c_LOCALFILE_ID
@@ -21,25 +32,182 @@ class DataStore:
     data: dict[str, Signal] = None
     start_timestamp: float = None
     end_timestamp: float = None
+    derived_formulas: dict[str, str] = None  # formule waarmee ieder afgeleid signaal in data is berekend
+    _chunk_index: ChunkIndex = field(default=None, init=False, repr=False, compare=False)  # zie get_range_stats
+    _chunk_stats: dict[str, ChunkStats] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _pyramids: dict[str, MinMaxPyramid] = field(default_factory=dict, init=False, repr=False, compare=False)  # zie get_plot_indices
+    _date_numbers: tuple[np.ndarray, np.ndarray] = field(default=None, init=False, repr=False, compare=False)  # (timestamps, date numbers)
+    _energy_indexes: dict[str, EnergyIndex] = field(default_factory=dict, init=False, repr=False, compare=False)  # zie get_energy
+    generation: int = field(default=0, init=False, repr=False, compare=False)  # nieuw nummer bij iedere wijziging van data
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)  # voor data en de caches hierboven
 
     def set_data(self, data: dict[str, list[float] | list[str]]):
+        """
+        Zet de data van de store; iedere kolom, ook de timestamp, wordt een float64 array in een Signal.
+        """
         if data:
-            self.signals = [signal for signal in data if signal != "units" and signal != DataStore.c_TIMESTAMP_ID]
+            signals = [signal for signal in data if signal != "units" and signal != DataStore.c_TIMESTAMP_ID]
             units = data["units"]
-            self.data = {k: Signal(name=k, data=v, unit=units[k] if k in units else "") for k, v in data.items() if k != "units" and k in self.signals or k == DataStore.c_TIMESTAMP_ID}
-            UnitStandardizer().execute(units, self.data, self.signals)
-            try:
-                self.end_timestamp = max(self.data[DataStore.c_TIMESTAMP_ID])
-                self.start_timestamp = min(self.data[DataStore.c_TIMESTAMP_ID])
-            except ValueError:
-                pass  # geen data
+            new_data = {k: Signal(name=k, data=v, unit=units[k] if k in units else "") for k, v in data.items() if k != "units" and k in signals or k == DataStore.c_TIMESTAMP_ID}
+            UnitStandardizer().execute(units, new_data, signals)
+            with self._lock:
+                self.derived_formulas = {}
+                self._chunk_index = None
+                self._chunk_stats = {}
+                self._pyramids = {}
+                self._date_numbers = None
+                self._energy_indexes = {}
+                if len(timestamps := new_data[DataStore.c_TIMESTAMP_ID].data) > 0:  # oplopend, dus zonder de kolom te doorlopen
+                    self.start_timestamp = float(timestamps[0])
+                    self.end_timestamp = float(timestamps[-1])
+                self.signals = signals
+                self.generation = next(DataStore.generations)
+                self.data = new_data  # als laatste, zodat lezers nooit ongeconverteerde data of oude caches zien
+
+    def append_data(self, data: dict[str, list[float] | list[str]]) -> bool:
+        """
+        Voegt de samples uit data die na end_timestamp liggen toe aan de bestaande kolommen. Afgeleide signalen worden
+        niet aangevuld, zie apply_derived_signal. Retourneert False als data niet aansluit op deze store (andere
+        signalen of eenheden); dan is set_data met de volledige data nodig.
+        """
+        if not self.data or self.end_timestamp is None:
+            return False
+        if {signal for signal in data if signal != "units" and signal != DataStore.c_TIMESTAMP_ID} != set(self.signals):
+            return False
+        units = data["units"]
+        tail = {k: Signal(name=k, data=data[k], unit=units[k] if k in units else "") for k in self.signals + [DataStore.c_TIMESTAMP_ID]}
+        UnitStandardizer().execute(units, tail, self.signals)
+        if any(tail[signal].unit != self.data[signal].unit for signal in self.signals):
+            return False
+        new_samples = slice(np.searchsorted(tail[DataStore.c_TIMESTAMP_ID].data, self.end_timestamp, side='right'), None)
+        if len(tail[DataStore.c_TIMESTAMP_ID].data[new_samples]) > 0:
+            appended = {k: Signal(name=k, data=np.concatenate((self.data[k].data, tail[k].data[new_samples])), unit=self.data[k].unit)
+                        for k in tail}
+            with self._lock:
+                for signal in self.signals:  # de bestaande samples blijven, dus ook de statistieken en pyramides
+                    self.keep_prefix(signal, len(self.data[signal]))
+                self.generation = next(DataStore.generations)
+                self.data = self.data | appended  # nieuwe dict, zodat lezers nooit een half bijgewerkte store zien
+                self.end_timestamp = float(self.data[DataStore.c_TIMESTAMP_ID].data[-1])
+        return True
+
+    def apply_derived_signal(self, derived_signal: DerivedSignal):
+        """
+        Berekent het afgeleide signaal en zet het in data. Als het signaal eerder met dezelfde formule is berekend en de
+        store sindsdien alleen is aangevuld, wordt alleen de staart geevalueerd: vanaf het laatste sample waarin alle
+        operanden geldig zijn, want daarvoor verandert het opvullen van ontbrekende samples niet.
+        """
+        if not self.data:
+            return
+        derived_signal.data = self.data  # de actuele data, met de eerder toegepaste afgeleide signalen als operand
+        name = derived_signal.name
+        existing = self.data.get(name) if self.derived_formulas.get(name) == derived_signal.formula.formula_text else None
+        start = 0
+        if existing is not None and derived_signal.formula.operands and all(operand in self.data for operand in derived_signal.formula.operands):
+            columns = [self.data[operand].data for operand in derived_signal.formula.operands]
+            start = last_common_valid_index(columns, min(len(existing), len(columns[0]))) or 0
+        if derived_data := derived_signal.get(start):
+            if start > 0:
+                derived_data.data = np.concatenate((existing.data[:start], derived_data.data))
+            with self._lock:
+                self.keep_prefix(name, start)
+                self.generation = next(DataStore.generations)
+                self.data = self.data | {name: derived_data}
+                self.derived_formulas[name] = derived_signal.formula.formula_text
+
+    def keep_prefix(self, signal_name: str, n_samples: int):
+        """Geeft aan dat alleen de eerste n_samples van een signaal bij een volgende wijziging ongewijzigd blijven"""
+        with self._lock:
+            self.generation = next(DataStore.generations)
+            for cache in [self._chunk_stats, self._pyramids, self._energy_indexes]:
+                if signal_name in cache:
+                    if n_samples > 0:
+                        cache[signal_name].valid_until = min(cache[signal_name].valid_until, n_samples)
+                    else:
+                        del cache[signal_name]
 
     def get_time_signal(self) -> Signal:
         return self.data[self.c_TIMESTAMP_ID]
 
+    def get_date_numbers(self) -> np.ndarray:
+        """
+        De timestamps als matplotlib date numbers (lokale tijd), eenmalig gevectoriseerd berekend. Na append_data wordt
+        alleen de staart omgerekend.
+        """
+        with self._lock:
+            timestamps = self.data[self.c_TIMESTAMP_ID].data
+            if self._date_numbers is None or self._date_numbers[0] is not timestamps:
+                if self._date_numbers is not None and len(self._date_numbers[1]) <= len(timestamps):  # timestamps zijn alleen aangevuld
+                    date_numbers = np.concatenate((self._date_numbers[1], timestamps_to_date_numbers(timestamps[len(self._date_numbers[1]):])))
+                else:
+                    date_numbers = timestamps_to_date_numbers(timestamps)
+                self._date_numbers = (timestamps, date_numbers)
+            return self._date_numbers[1]
+
     def get_signal(self, signal_name: str) -> Signal:
         return self.data[signal_name]
 
+    def get_time_slice(self, time_range: tuple[float, float]) -> slice | None:
+        """Slice van de samples binnen time_range, inclusief het naastgelegen sample aan beide kanten"""
+        return interval_to_slice(self.data[self.c_TIMESTAMP_ID].data, time_range[0], time_range[1])
+
+    def get_chunk_index(self) -> ChunkIndex:
+        """Index van de samples per dag; na append_data wordt alleen de laatste dag opnieuw bepaald"""
+        with self._lock:
+            timestamps = self.data[self.c_TIMESTAMP_ID].data
+            if self._chunk_index is None or self._chunk_index.timestamps is not timestamps:
+                self._chunk_index = ChunkIndex(timestamps, previous=self._chunk_index)
+            return self._chunk_index
+
+    def get_range_stats(self, signal_name: str, time_range: tuple[float, float] | None = None) -> RangeStats:
+        """
+        Min, max, som en aantal van de geldige samples van een signaal binnen time_range (grenzen inbegrepen). Alleen de
+        dagen binnen time_range worden gelezen; hun statistieken worden bewaard tot het signaal verandert.
+        """
+        with self._lock:
+            index = self.get_chunk_index()
+            data = self.data[signal_name].data
+            start, stop = 0, len(data)
+            if time_range is not None:  # in beide gevallen hieronder dezelfde, exacte grenzen
+                start = min(int(np.searchsorted(index.timestamps, time_range[0], side='left')), len(data))
+                stop = min(int(np.searchsorted(index.timestamps, time_range[1], side='right')), len(data))
+            if len(data) != len(index.timestamps):  # afgeleid signaal dat na append_data nog niet is bijgewerkt
+                return RangeStats.of(data[start:stop])
+            stats = self._chunk_stats.get(signal_name)
+            if stats is None or stats.data is not data or stats.index is not index:
+                stats = self._chunk_stats[signal_name] = ChunkStats(data, index, previous=stats)
+            return stats.range_stats(start, stop)
+
+    def get_energy(self, signal_name: str, time_range: tuple[float, float] | None = None) -> float:
+        """
+        Integraal van een vermogenssignaal over time_range (standaard de hele store) in eenheid van het signaal x uur,
+        met de werkelijke timestamps. Opgezocht in een cumulatieve index die na append_data alleen wordt aangevuld.
+        """
+        with self._lock:
+            timestamps = self.data[self.c_TIMESTAMP_ID].data
+            data = self.data[signal_name].data
+            index = self._energy_indexes.get(signal_name)  # een afgeleid signaal kan na append_data korter zijn dan timestamps
+            if index is None or index.data is not data or index.timestamps is not timestamps:
+                index = self._energy_indexes[signal_name] = EnergyIndex(timestamps, data, previous=index)
+            if time_range is None:
+                return index.integral_at(math.inf) / 3600.0
+            return index.integral(time_range[0], time_range[1]) / 3600.0
+
+    def get_plot_indices(self, signal_name: str, i_range: slice, max_points: int) -> slice | np.ndarray:
+        """
+        De te plotten samples van een signaal binnen i_range: alle samples, of als dat er meer dan max_points zijn de
+        minima en maxima uit de min/max pyramide, zodat pieken zichtbaar blijven.
+        """
+        with self._lock:
+            start, stop, _ = i_range.indices(len(self.data[signal_name]))
+            if stop - start <= max_points:
+                return slice(start, stop)
+            data = self.data[signal_name].data
+            pyramid = self._pyramids.get(signal_name)
+            if pyramid is None or pyramid.data is not data:
+                pyramid = self._pyramids[signal_name] = MinMaxPyramid(data, previous=pyramid)
+            return pyramid.downsample(start, stop, max_points)
+
     def get_sampling_time(self):
         if (n_samples := len(self.data[self.c_TIMESTAMP_ID])) > 1:
             return (self.end_timestamp - self.start_timestamp) / (n_samples - 1)
@@ -66,9 +234,17 @@ class DataStore:
                     new_group[unit] = group[unit]
         return new_group
 
+    def get_columns(self, signals, time_range) -> dict[str, np.ndarray]:
+        """De kolommen die serialize wegschrijft, als arrays (de timestamp voorop)"""
+        if time_range is not None:
+            i_range = self.get_time_slice(time_range) or slice(0, 0)
+            return {signal: self.data[signal].data[i_range] for signal in self.data
+                    if signals is None or signal in signals or signal == DataStore.c_TIMESTAMP_ID}
+        return {signal: self.data[signal].data for signal in self.data}
+
     def serialize(self, signals, time_range, name=None):
         if time_range is not None:
-            i_range = interval_to_range(self.data[DataStore.c_TIMESTAMP_ID].data, time_range[0], time_range[1])
+            i_range = self.get_time_slice(time_range) or slice(0, 0)
             data = [self.data[signal].serialize(i_range) for signal in self.data if signals is None or signal in signals or signal == DataStore.c_TIMESTAMP_ID]
         else:
             data = [self.data[signal].serialize() for signal in self.data]
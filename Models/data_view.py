@@ -1,6 +1,8 @@
 import json
 from enum import Enum, auto
+import numpy as np
 from Models.data_store import DataStore, c_LOCALFILE_ID
+from Utils.columnar_format import c_MAGIC, write_columns, decode_columns
 
 
 class PlotRepresentation(Enum):
@@ -11,9 +13,14 @@ class PlotRepresentation(Enum):
 
 class DataView:
     """
-    Een view is een collectie van DataStores en een selectie van signals hiervan
+    Een view is een collectie van DataStores en een selectie van signals hiervan.
+    Een view wordt opgeslagen als json of (extensie c_COLUMNS_EXTENSION) in het binaire kolommenformaat: een manifest
+    met de data_stores, signalen en eenheden, gevolgd door per kolom een blok float64. Zo'n file wordt bij het laden
+    met numpy.memmap geopend, zodat alleen de samples die worden gebruikt van schijf worden gelezen.
     """
 
+    c_COLUMNS_EXTENSION = ".pvd"
+
     def __init__(self, name: str, specified_names: dict[str, list[str]], all_data_stores: list[DataStore],
                  plot_representation=PlotRepresentation.LINE):
         self.name = name
@@ -52,11 +59,33 @@ class DataView:
         }
 
     def save(self, full_file_name: str, signals: list[str], time_range):
+        if full_file_name.endswith(self.c_COLUMNS_EXTENSION):
+            self.save_columns(full_file_name, signals, time_range)
+            return
         with open(full_file_name, "w") as openfile:
             json.dump(self.serialize(full_file_name, signals, time_range), openfile)
 
+    def save_columns(self, full_file_name: str, signals: list[str], time_range):
+        columns = {}
+        manifest = {}
+        for data_store in self.selection:
+            store_signals = [signal for signal in self.selection[data_store] if signals is None or signal in signals]
+            store_columns = data_store.get_columns(store_signals, time_range)
+            manifest[data_store.name] = {
+                "signals": [signal for signal in data_store.signals if signal in store_signals],
+                "columns": list(store_columns),
+                "units": {column: data_store.data[column].unit for column in store_columns if column != DataStore.c_TIMESTAMP_ID}
+            }
+            columns |= {f"{data_store.name}/{column}": data for column, data in store_columns.items()}
+        with open(full_file_name, "wb") as openfile:
+            write_columns(openfile, columns, {"view_name": self.name, "data_stores": manifest})
+
     def load(self, full_file_name, all_data_stores):
         try:
+            with open(full_file_name, 'rb') as openfile:
+                is_columns_file = openfile.read(len(c_MAGIC)) == c_MAGIC
+            if is_columns_file:
+                return self.load_columns(full_file_name)
             with open(full_file_name, 'r') as openfile:
                 try:
                     stream = json.load(openfile)
@@ -82,6 +111,26 @@ class DataView:
         self.selection = self.evaluate(specified_names, new_data_stores)
         return new_data_stores
 
+    def load_columns(self, full_file_name: str) -> list[DataStore] | None:
+        buffer = np.memmap(full_file_name, dtype=np.uint8, mode='r')  # de kolommen worden views op deze mapping
+        try:
+            columns, meta = decode_columns(buffer)
+        except ValueError:
+            return None
+        new_data_stores = []
+        specified_names: dict[str, list[str]] = {}
+        try:
+            for data_store_key, manifest in meta["data_stores"].items():
+                specified_names[data_store_key] = manifest["signals"]
+                data_store = DataStore(name=data_store_key, database=c_LOCALFILE_ID, signals=manifest["signals"])
+                data_store.set_data({column: columns[f"{data_store_key}/{column}"] for column in manifest["columns"]} | {"units": manifest["units"]})
+                new_data_stores.append(data_store)
+            self.name = meta["view_name"]
+        except KeyError:
+            raise RuntimeError("Invalid file format")
+        self.selection = self.evaluate(specified_names, new_data_stores)
+        return new_data_stores
+
     def is_local_file(self) -> bool:  # TODO documenteren
         if self.name == c_LOCALFILE_ID:
             return True
@@ -94,3 +143,34 @@ class DataView:
             name = names[0]
             assert all([data_store.name == name for data_store in self.selection])
             return name
+
+
+if __name__ == "__main__":
+    import os
+    import resource
+    import sys
+    import tempfile
+    import time
+
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 90.0
+    n_samples = int(days * 8640)
+    rng = np.random.default_rng(0)
+    data_store = DataStore(name="P1", database="P1")
+    data_store.set_data({"timestamp": 1.7e9 + 10.0 * np.arange(n_samples),
+                         "CURRENT_USAGE": np.where(rng.random(n_samples) < 0.001, np.nan, rng.uniform(0, 5000, n_samples)),
+                         "CURRENT_PRODUCTION": rng.uniform(0, 3000, n_samples), "SOLAR": rng.uniform(0, 3000, n_samples),
+                         "units": {"CURRENT_USAGE": "W", "CURRENT_PRODUCTION": "W", "SOLAR": "W"}})
+    data_view = DataView.from_data_store(data_store, [data_store])
+    directory = tempfile.mkdtemp()
+    window = (1.7e9 + 5e5, 1.7e9 + 5e5 + 7200)
+    for extension in [DataView.c_COLUMNS_EXTENSION, ".json"]:  # eerst memmap, want ru_maxrss is de piek van het proces
+        file_name = os.path.join(directory, "view" + extension)
+        data_view.save(file_name, None, None)
+        start = time.perf_counter()
+        loaded = DataView(c_LOCALFILE_ID, {}, []).load(file_name, [])
+        visible = loaded[0].get_signal("SOLAR").data[loaded[0].get_time_slice(window)]
+        elapsed = time.perf_counter() - start
+        print(f"{extension:5}: {os.path.getsize(file_name) / 1e6:.0f} MB file, {n_samples} samples, loaded in {elapsed:.2f} s, "
+              f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3:.0f} MB")
+        assert np.array_equal(visible, data_store.get_signal("SOLAR").data[data_store.get_time_slice(window)])
+        assert np.array_equal(loaded[0].get_signal("CURRENT_USAGE").data, data_store.get_signal("CURRENT_USAGE").data, equal_nan=True)
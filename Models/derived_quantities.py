@@ -1,31 +1,177 @@
-from Algorithms.binary_search import interval_to_range
+import re
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable
+import numpy as np
+from Algorithms.chunk_stats import RangeStats
 from Models.data_store import DataStore
 
 
+class Window:
+    """
+    Een signaal van een data_store binnen time_range. Wat de operaties nodig hebben (samples, statistieken, energie)
+    wordt eenmaal bepaald, hoeveel operaties het signaal ook gebruiken.
+    """
+
+    def __init__(self, data_store: DataStore, signal_name: str, time_range: tuple[float, float] | None):
+        self.data_store = data_store
+        self.signal_name = signal_name
+        self.time_range = time_range
+
+    @cached_property
+    def values(self) -> np.ndarray:
+        data = self.data_store.data[self.signal_name].data
+        if self.time_range is None:
+            return data
+        timestamps = self.data_store.data[DataStore.c_TIMESTAMP_ID].data[:len(data)]
+        return data[np.searchsorted(timestamps, self.time_range[0], side='left'):
+                    np.searchsorted(timestamps, self.time_range[1], side='right')]
+
+    @cached_property
+    def valid_values(self) -> np.ndarray:
+        return self.values[~np.isnan(self.values)]
+
+    @cached_property
+    def stats(self) -> RangeStats:
+        return self.data_store.get_range_stats(self.signal_name, self.time_range)
+
+    @cached_property
+    def energy(self) -> float | None:
+        """Energie in kWh van een vermogenssignaal in W"""
+        if len(self.data_store.data[self.signal_name]) < 2:
+            return None
+        return self.data_store.get_energy(self.signal_name, self.time_range) / 1000.0
+
+
+@dataclass
+class Operation:
+
+    label: str  # naam van het resultaat, met {signal} voor het (eerste) signaal
+    function: Callable[..., float | None]  # van een Window per signaal naar de waarde
+    n_signals: int = 1  # 1: per signaal uit de settings; meer: de signalen uit de settings zijn de operanden
+
+
+def percentile(q: float) -> Operation:
+    return Operation("{signal} P" + f"{q:g}", lambda window: float(np.percentile(window.valid_values, q)) if window.valid_values.size else None)
+
+
+def meter_delta(window: Window) -> float | None:
+    """Toename van een meterstand (bijv. USAGE_TARIFF_1 in kWh) binnen het venster"""
+    return float(window.valid_values[-1] - window.valid_values[0]) if window.valid_values.size else None
+
+
+def self_consumption(solar: Window, production: Window) -> float | None:
+    """Deel van de opgewekte energie (SOLAR) dat niet aan het net is geleverd (CURRENT_PRODUCTION)"""
+    if solar.energy is None or production.energy is None or solar.energy <= 0.0:
+        return None
+    return 1.0 - production.energy / solar.energy
+
+
 class DerivedQuantities:
+    """
+    Berekent de afgeleide grootheden uit de settings, bijv. {"TotalEnergy": ["SOLAR"], "Peak": ["CURRENT_USAGE"],
+    "Percentile95": ["CURRENT_USAGE"], "SelfConsumption": ["SOLAR", "CURRENT_PRODUCTION"]}, over het getoonde
+    tijdvenster. De operaties staan in c_OPERATIONS. Resultaten worden bewaard per operatie, signalen en time_range
+    zolang de data van de signalen niet is vervangen; een redraw zonder ander venster rekent dus niets opnieuw.
+    """
+
+    c_OPERATIONS: dict[str, Operation] = {
+        "TotalEnergy": Operation("{signal}", lambda window: window.energy),
+        "Mean": Operation("{signal} mean", lambda window: window.stats.mean if window.stats.count else None),
+        "Peak": Operation("{signal} peak", lambda window: window.stats.max if window.stats.count else None),
+        "Min": Operation("{signal} min", lambda window: window.stats.min if window.stats.count else None),
+        "TariffEnergy": Operation("{signal} energy", meter_delta),
+        "SelfConsumption": Operation("Self consumption {signal}", self_consumption, n_signals=2),
+    }
+    c_PERCENTILE = re.compile(r"Percentile(\d+(\.\d+)?)$")
+    c_MAX_RESULTS = 256
+
+    results: OrderedDict[tuple, tuple[tuple, float | None]] = OrderedDict()  # gedeeld door alle instanties; (weakrefs naar de arrays, waarde)
 
     def __init__(self, parameters: dict[str, list]):
         self.parameters = parameters
 
+    @classmethod
+    def get_operation(cls, name: str) -> Operation | None:
+        if (match := cls.c_PERCENTILE.match(name)) is not None:
+            return percentile(float(match.group(1)))
+        return cls.c_OPERATIONS.get(name)
+
     def get_values(self, data_stores: list[DataStore], signals: list[str], time_range: tuple[float]) -> dict[str, float]:
         res = {}
-        for operation in self.parameters:
-            if operation == "TotalEnergy":
-                for signal_name in self.parameters[operation]:
-                    for data_store in data_stores:
-                        if data_store.data and signal_name in data_store.data and signal_name in signals:
-                            res[signal_name] = self.total_energy(data_store, signal_name, time_range)
+        if not self.parameters:
+            return res
+        stores = {}  # signaal naar de data_store met dat signaal
+        for data_store in data_stores:
+            if data_store.data:
+                stores.update({signal: data_store for signal in data_store.data if signal not in stores})
+        displayed = set(signals)
+        windows: dict[str, Window] = {}
+        for name, signal_names in self.parameters.items():
+            if (operation := self.get_operation(name)) is None:
+                continue
+            if operation.n_signals == 1:
+                operand_lists = [[signal_name] for signal_name in signal_names]
+            else:
+                operand_lists = [signal_names[:operation.n_signals]] if len(signal_names) >= operation.n_signals else []
+            for operands in operand_lists:
+                if operands[0] not in displayed or not all(operand in stores for operand in operands):
+                    continue
+                key = (name, tuple(operands), time_range)
+                version = tuple(column for operand in operands for column in
+                                (stores[operand].data[operand].data, stores[operand].data[DataStore.c_TIMESTAMP_ID].data))
+                if (result := self.results.get(key)) is None or not self.is_current(result[0], version):
+                    for operand in operands:
+                        if operand not in windows:
+                            windows[operand] = Window(stores[operand], operand, time_range)
+                    result = (tuple(weakref.ref(column) for column in version),
+                              operation.function(*(windows[operand] for operand in operands)))
+                    self.store_result(key, result)
+                res[operation.label.format(signal=operands[0])] = result[1]
         return res
 
     @staticmethod
-    def total_energy(data_store: DataStore, signal_name: str, time_range) -> float | None:
-        signal = data_store.data[signal_name].fix_signal()
-        if (time_range is not None and
-                (i_range := interval_to_range(data_store.data[DataStore.c_TIMESTAMP_ID].data, time_range[0], time_range[1]))):
-            data = [signal[i] for i in i_range]
-        else:
-            data = signal.data
-        try:
-            return sum(data) * data_store.get_sampling_time() / 3600.0 / 1000.0
-        except TypeError:
-            return None
+    def is_current(result_version: tuple, version: tuple) -> bool:
+        """
+        Vergelijkt op identiteit via weak references: het resultaat houdt oude arrays niet vast, en een ref naar een
+        vrijgegeven array geeft None, dus een opnieuw uitgegeven id geeft geen vals resultaat
+        """
+        return len(result_version) == len(version) and all(ref() is column for ref, column in zip(result_version, version))
+
+    @classmethod
+    def store_result(cls, key: tuple, result: tuple):
+        cls.results[key] = result
+        cls.results.move_to_end(key)
+        while len(cls.results) > cls.c_MAX_RESULTS:
+            cls.results.popitem(last=False)
+
+
+if __name__ == "__main__":
+    import time
+
+    n_samples = 30 * 8640  # een maand 10-seconden data
+    rng = np.random.default_rng(0)
+    timestamps = 1.7e9 + 10.0 * np.arange(n_samples)
+    solar = np.clip(4000.0 * np.sin(2 * np.pi * timestamps / 86400.0), 0.0, None)
+    production = np.clip(solar - rng.uniform(0, 1500, n_samples), 0.0, None)
+    usage = rng.uniform(0, 5000, n_samples)
+    data_store = DataStore("P1", "stub")
+    data_store.set_data({DataStore.c_TIMESTAMP_ID: timestamps, "SOLAR": solar, "CURRENT_PRODUCTION": production,
+                         "CURRENT_USAGE": usage, "USAGE_TARIFF_1": 1000.0 + np.cumsum(usage) * 10.0 / 3.6e6,
+                         "units": {"SOLAR": "W", "CURRENT_PRODUCTION": "W", "CURRENT_USAGE": "W", "USAGE_TARIFF_1": "kWh"}})
+    parameters = {"TotalEnergy": ["SOLAR", "CURRENT_USAGE"], "Mean": ["CURRENT_USAGE"], "Peak": ["CURRENT_USAGE"],
+                  "Min": ["CURRENT_USAGE"], "Percentile95": ["CURRENT_USAGE"], "TariffEnergy": ["USAGE_TARIFF_1"],
+                  "SelfConsumption": ["SOLAR", "CURRENT_PRODUCTION"]}
+    signals = ["SOLAR", "CURRENT_PRODUCTION", "CURRENT_USAGE", "USAGE_TARIFF_1"]
+    time_range = (timestamps[1000], timestamps[200_000])
+    for run in ["first", "memoized"]:
+        start = time.perf_counter()
+        values = DerivedQuantities(parameters).get_values([data_store], signals, time_range)
+        print(f"{run}: {1000 * (time.perf_counter() - start):.2f} ms")
+    for label, value in values.items():
+        print(f"  {label:28} {value:.3f}")
+    window = usage[1000:200_001]
+    assert np.isclose(values["CURRENT_USAGE mean"], window.mean()) and values["CURRENT_USAGE peak"] == window.max()
+    assert np.isclose(values["USAGE_TARIFF_1 energy"], values["CURRENT_USAGE"], rtol=1e-3)
@@ -1,6 +1,11 @@
 import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from Models.data_store import DataStore, c_LOCALFILE_ID
+from Models.data_cache import DataCache
 from Models.data_view import DataView, PlotRepresentation
 from Models.derived_quantities import DerivedQuantities
 from ServerRequests.server_requests import ServerRequests
@@ -13,27 +18,44 @@ from ServerRequests.server_requests import TransferInfo
 class Model:
     """
     Eigenaar van de data_views en de data_stores. De data_views houden referenties bij van de data_stores. Bij
-    initialisatie zijn de data_stores nog niet gevuld met data.
+    initialisatie zijn de data_stores nog niet gevuld met data. Met use_cache wordt opgehaalde data lokaal bewaard, zodat
+    bij een volgende start alleen de ontbrekende staart van de server hoeft te komen.
     """
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.time_range = None
+        self.server_requests = ServerRequests()  # een client met gedeelde connection pool voor alle requests
+        self.data_cache = DataCache() if use_cache else None
+        self.data_store_locks: dict[str, threading.Lock] = {}
+        self.data_store_locks_lock = threading.Lock()
         self.data_stores: list[DataStore] = self.init_data_stores()
         self.data_views: dict[str, DataView] = self.init_data_views()
         self.current_data_view_name: str | None = None
 
     def init_data_stores(self) -> list[DataStore]:
         data_stores = []
+        start = time.perf_counter()
         try:
-            data_store_ids = ServerRequests().get_data_stores()
-            for data_store_id in data_store_ids:
-                data_store_info = ServerRequests().get_data_store_info(data_store_id)
-                signals = [signal for signal in data_store_info["Signals"] if Settings().getSignalCheckState(data_store_info["Name"], signal) is True]
+            data_store_infos = self.discover_data_stores(self.server_requests, Config().get_max_concurrency())
+            settings = Settings()
+            for data_store_info in data_store_infos:
+                signals = [signal for signal in data_store_info["Signals"] if settings.getSignalCheckState(data_store_info["Name"], signal) is True]
                 data_stores.append(DataStore(name=data_store_info["Name"], signals=signals, database=data_store_info["Db"]))
         except Exception as err:
             logging.debug(f"Connection error {err}")
+        logging.info(f"Discovered {len(data_stores)} data stores in {1000 * (time.perf_counter() - start):.0f} ms")
         return data_stores
 
+    @staticmethod
+    def discover_data_stores(server_requests: ServerRequests, max_workers: int) -> list[dict]:
+        """
+        Haalt de lijst van data_stores op en vervolgens van alle data_stores tegelijk de info, met ten hoogste
+        max_workers gelijktijdige requests. De volgorde van het resultaat is die van de server.
+        """
+        data_store_ids = server_requests.get_data_stores()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(data_store_ids)))) as executor:
+            return list(executor.map(server_requests.get_data_store_info, data_store_ids))
+
     def init_data_views(self) -> dict[str, DataView] | None:
         if all_data_stores := self.data_stores:
             data_views = Settings().get_data_views(all_data_stores)
@@ -81,29 +103,97 @@ class Model:
         data_view = self.get_current_data_view()
         return data_view.get_data_stores()
 
-    def acquire_data(self, data_view: DataView) -> TransferInfo | None:
+    def acquire_data(self, data_view: DataView, cancel_event: threading.Event | None = None,
+                     progress: Callable[[int, int], None] | None = None) -> TransferInfo | None:
+        """
+        Vult de data_stores van data_view, inclusief afgeleide signalen. Data van de server wordt voor alle data_stores
+        tegelijk opgehaald en verwerkt; de TransferInfo is het totaal over de data_stores.
+        Kan vanuit een achtergrondthread worden aangeroepen. Als cancel_event wordt gezet, worden data_stores waarvan de
+        data nog niet binnen is niet meer bijgewerkt. progress(klaar, totaal) wordt aangeroepen per afgeronde data_store;
+        een lokaal bestand wordt in een keer geladen en meldt alleen progress(0, 0), een bezig-indicator.
+        """
         if data_view.is_local_file():
+            if progress:
+                progress(0, 0)
             new_data_stores = data_view.load(self.get_local_file_name(data_view), self.data_stores)
+            if self.is_cancelled(cancel_event):
+                return
             self.handle_new_data_stores(new_data_stores)
-        else:
-            transfer_info = None
             for data_store in data_view.get_data_stores():
-                try:
-                    data, transfer_info = ServerRequests().get_data(data_store)
-                except ConnectionError as err:
-                    logging.debug(f"ConnectionError: {err}")
-                    return
-                except TypeError as err:
-                    logging.debug(f"TypeError: {err}")
-                    return
-                data_store.set_data(data)
+                self.handle_derived_data(data_store)
+        else:
+            start = time.perf_counter()
+            data_stores = data_view.get_data_stores()
+            transfer_infos = []
+            with ThreadPoolExecutor(max_workers=max(1, min(Config().get_max_concurrency(), len(data_stores)))) as executor:
+                futures = [executor.submit(self.acquire_data_store, data_store, cancel_event) for data_store in data_stores]
+                for n_done, future in enumerate(as_completed(futures), start=1):
+                    if transfer_info := future.result():
+                        transfer_infos.append(transfer_info)
+                    if progress:
+                        progress(n_done, len(futures))
+            if transfer_infos:
+                return TransferInfo.combine(transfer_infos, time.perf_counter() - start)
+
+    def acquire_data_store(self, data_store: DataStore, cancel_event: threading.Event | None = None) -> TransferInfo | None:
+        """
+        Haalt de data van een data_store op, standaardiseert de eenheden en berekent de afgeleide signalen. Een nog lege
+        data_store wordt eerst uit de lokale cache gevuld; daarna wordt alleen de staart opgehaald.
+        """
+        with self.get_data_store_lock(data_store):  # een data_store kan in meerdere (ook geannuleerde) loads voorkomen
+            if self.is_cancelled(cancel_event):
+                return
+            if not data_store.data and self.data_cache is not None:
+                if cached_data := self.data_cache.load(self.server_requests.server_url(""), data_store):
+                    data_store.set_data(cached_data)
+                    self.handle_derived_data(data_store)
+            try:
+                if data_store.data and data_store.end_timestamp is not None:  # alleen de ontbrekende staart ophalen
+                    data, transfer_info = self.server_requests.get_data(data_store, since=data_store.end_timestamp)
+                    if self.is_cancelled(cancel_event):
+                        return
+                    if data_store.append_data(data):
+                        self.handle_derived_data(data_store)
+                        self.store_in_cache(data_store)
+                        return transfer_info
+                    logging.debug(f"Delta of {data_store.name} does not match, fetching full history")
+                data, transfer_info = self.server_requests.get_data(data_store)
+            except ConnectionError as err:
+                logging.debug(f"ConnectionError: {err}")
+                return
+            except TypeError as err:
+                logging.debug(f"TypeError: {err}")
+                return
+            if self.is_cancelled(cancel_event):
+                return
+            data_store.set_data(data)
+            self.handle_derived_data(data_store)
+            self.store_in_cache(data_store)
             return transfer_info
 
+    def store_in_cache(self, data_store: DataStore):
+        if self.data_cache is not None:
+            try:
+                self.data_cache.store(self.server_requests.server_url(""), data_store)
+            except OSError as err:
+                logging.debug(f"Caching {data_store.name} failed: {err}")
+
+    def get_data_store_lock(self, data_store: DataStore) -> threading.Lock:
+        with self.data_store_locks_lock:
+            return self.data_store_locks.setdefault(data_store.name, threading.Lock())
+
+    @staticmethod
+    def is_cancelled(cancel_event: threading.Event | None) -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    def get_shift_info(self):
+        return self.server_requests.get_shift_info()
+
     def get_server_queries(self) -> list[str]:
-        return ServerRequests().get_urls()
+        return self.server_requests.get_urls()
 
     def apply_query(self, path: str):
-        return ServerRequests().apply_url(path)
+        return self.server_requests.apply_url(path)
 
     def init_dataview_from_local_file(self, filename: str):
         """
@@ -120,9 +210,8 @@ class Model:
 
     @staticmethod
     def handle_derived_data(data_store: DataStore):
-        for derivedSignal in Settings().getDerivedSignals(data_store.data):
-            if derived_data := derivedSignal.get():
-                data_store.data[derivedSignal.name] = derived_data
+        for derivedSignal in Settings().getDerivedSignals(data_store.data) or []:
+            data_store.apply_derived_signal(derivedSignal)
 
     @staticmethod
     def get_derived_colors():
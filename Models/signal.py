@@ -1,51 +1,45 @@
-from dataclasses import dataclass
+from __future__ import annotations
+from dataclasses import dataclass, field
+import numpy as np
+from Algorithms.gap_fill import GapFill, fill_gaps
+from Utils.config import Config
 
 
 @dataclass
 class Signal:
+    """
+    Een signaal als aaneengesloten float64 array. Ontbrekende samples zijn NaN; valid geeft het bijbehorende masker.
+    """
     name: str
-    data: list[float]
+    data: np.ndarray
     unit: str
-    num: int = -1  # iterator
+    _fixed: tuple[np.ndarray, dict] | None = field(default=None, init=False, repr=False, compare=False)  # cache fix_signal
 
-    def fix_signal(self):
-        fixed = Signal(name=self.name, data=len(self) * [0.0], unit=self.unit)
-        for i, value in enumerate(self):
-            if value:
-                fixed[i] = value
-            else:
-                if 0 < i < len(self) - 1:
-                    if self[i - 1] is not None and self[i + 1] is not None:
-                        fixed[i] = (self[i - 1] + self[i + 1]) / 2.0
-                    elif self[i - 1] is not None:
-                        fixed[i] = self[i - 1]
-                    elif self[i + 1] is not None:
-                        fixed[i] = self[i + 1]
-                    else:
-                        fixed[i] = 0.0
-                else:
-                    if i > 0:
-                        if self[len(self) - 1] is None:
-                            fixed[i] = 0.0
-                        else:
-                            fixed[i] = self[len(self) - 1]
-                    else:
-                        if self[0] is None:
-                            fixed[i] = 0.0
-                        else:
-                            fixed[i] = self[0]
-        return fixed
+    def __post_init__(self):
+        self.data = np.asarray(self.data, dtype=np.float64)  # None wordt NaN; geen kopie als data al float64 is
 
-    def __iter__(self):
-        return self
+    @property
+    def valid(self) -> np.ndarray:
+        return ~np.isnan(self.data)
+
+    def fix_signal(self, mode: GapFill | None = None, hold_edges: bool | None = None):
+        """
+        Geeft een Signal zonder ontbrekende samples, gevuld volgens mode; aan de randen 0.0, of met hold_edges het
+        dichtstbijzijnde geldige sample (beide standaard uit config.ini). Het resultaat wordt bewaard en opnieuw
+        berekend zodra data wordt vervangen of gewijzigd.
+        """
+        if mode is None:
+            mode = Config().get_gap_fill_mode()
+        if hold_edges is None:
+            hold_edges = Config().get_gap_fill_hold_edges()
+        if self._fixed is None or self._fixed[0] is not self.data:
+            self._fixed = (self.data, {})
+        if (mode, hold_edges) not in self._fixed[1]:
+            self._fixed[1][(mode, hold_edges)] = Signal(name=self.name, data=fill_gaps(self.data, mode, hold_edges), unit=self.unit)
+        return self._fixed[1][(mode, hold_edges)]
 
-    def __next__(self):
-        if self.num + 1 >= len(self.data):
-            self.num = -1
-            raise StopIteration
-        else:
-            self.num += 1
-            return self.data[self.num]
+    def __iter__(self):
+        return iter(self.data)
 
     def __len__(self):
         return len(self.data)
@@ -55,17 +49,19 @@ class Signal:
 
     def __setitem__(self, key, value):
         self.data[key] = value
+        self._fixed = None
 
     def min(self):
-        return min(self.data)
+        return float(np.nanmin(self.data))
 
     def max(self):
-        return max(self.data)
+        return float(np.nanmax(self.data))
 
     def serialize(self, idx_range=None):
+        data = self.data if idx_range is None else self.data[idx_range]
         return {
             "name": self.name,
-            "data": self.data if idx_range is None else [self.data[i] for i in idx_range],
+            "data": np.where(np.isnan(data), None, data).tolist(),  # NaN is geen geldige json, dus terug naar null
             "unit": self.unit
         }
 
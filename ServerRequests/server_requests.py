@@ -1,29 +1,75 @@
 import logging
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from Models.data_store import DataStore
+from ServerRequests.stream_decoder import JsonColumnDecoder
+from Utils.columnar_format import c_MIME_TYPE, decode_columns
 from Utils.config import Config
 
 
 class ServerRequests:
+    """
+    Client van de RAPI server. Alle requests lopen via een gedeelde requests.Session met connection pooling,
+    keep-alive, gzip/deflate en timeouts/retries volgens config.ini [CONNECTION]. Maak er daarom een aan en hergebruik
+    die; de Session mag vanuit meerdere threads tegelijk worden gebruikt.
+    """
+
+    c_CHUNK_SIZE = 1 << 16
 
-    def __init__(self):
-        pass
+    def __init__(self, base_url: str | None = None):
+        self.base_url = base_url  # bijv. http://localhost:8080; standaard volgens config.ini
+        self.timeout = (Config().get_connect_timeout(), Config().get_read_timeout())
+        self.session = self.create_session()
 
-    def get_data(self, data_store: DataStore):
+    @staticmethod
+    def create_session() -> requests.Session:
+        session = requests.Session()
+        retries = Retry(total=Config().get_retries(), backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset({'GET'}))
+        pool_size = max(Config().get_pool_size(), Config().get_max_concurrency())  # een connectie per gelijktijdig request
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'})
+        return session
+
+    def get(self, url: str, **kwargs) -> tuple[requests.Response, float]:
+        """GET via de gedeelde Session; retourneert de response en de werkelijk verstreken tijd in s"""
+        start = time.perf_counter()
+        resp = self.session.get(url, timeout=self.timeout, **kwargs)
+        resp.content  # body volledig binnenhalen voordat de tijd wordt gemeten
+        return resp, time.perf_counter() - start
+
+    def get_data(self, data_store: DataStore, since: float | None = None):
         """
-        Vraagt beschikbare data op van data_store voor alle signalen.
+        Vraagt beschikbare data op van data_store voor alle signalen; met since alleen de samples na dat tijdstip.
         Retourneert data en TransferInfo
         """
         result: TransferInfo | None = None
+        args = {'data_store_name': data_store.name, 'signals': data_store.signals_comma_separated()}
+        if since is not None:
+            args['since'] = since
+        accept = f'{c_MIME_TYPE}, application/json;q=0.9' if Config().get_binary_transfer() else 'application/json'
         try:
-            resp = requests.get(self.url_with_args(self.server_url(Config().get_data_url()),
-                                {'data_store_name': data_store.name, 'signals': data_store.signals_comma_separated()}),
-                                headers={'Accept': 'application/json'})
-            data = resp.json()
-            result = TransferInfo(resp)
-            logging.debug(f"Received data. # bytes: {len(resp.text)} in {resp.elapsed.microseconds / 1000} ms "
-                          f"({len(resp.text) / resp.elapsed.microseconds} MB/s)")
+            start = time.perf_counter()
+            with self.session.get(self.url_with_args(self.server_url(Config().get_data_url()), args), timeout=self.timeout,
+                                  headers={'Accept': accept}, stream=True) as resp:
+                if resp.headers.get('Content-Type', '').startswith(c_MIME_TYPE):
+                    body = resp.content
+                    columns, meta = decode_columns(body)  # zonder kopie, de kolommen verwijzen naar body
+                    data = columns | {"units": meta.get("units", {})}
+                    num_bytes = len(body)
+                else:
+                    decoder = JsonColumnDecoder()  # body wordt per chunk direct in float64 kolommen geparsed
+                    for chunk in resp.iter_content(chunk_size=self.c_CHUNK_SIZE):
+                        decoder.feed(chunk)
+                    data = decoder.result()
+                    num_bytes = decoder.num_bytes
+                result = TransferInfo.from_response(resp, time.perf_counter() - start, num_bytes=num_bytes)
+            logging.debug(f"Received data: {result}")
         except Exception as e:
             logging.debug(f"Could not receive data, error: {e}")
             return None
@@ -36,7 +82,7 @@ class ServerRequests:
 
     def get_data_stores(self) -> list[str]:
         try:
-            resp = requests.get(self.server_url(Config().get_data_stores_url()), headers={'Accept': 'application/json'})
+            resp, _ = self.get(self.server_url(Config().get_data_stores_url()))
             logging.debug(f"Received response on get_data_stores() query: {resp.json()}")
             return resp.json()["data_stores"]
         except ConnectionError:
@@ -44,7 +90,7 @@ class ServerRequests:
 
     def get_data_store_info(self, data_store_id: str):
         try:
-            resp = requests.get(self.server_url(Config().get_data_store_info_url(data_store_id)), headers={'Accept': 'application/json'})
+            resp, _ = self.get(self.server_url(Config().get_data_store_info_url(data_store_id)))
             logging.debug(f"Received response on get_data_store_info_url() query: {resp.json()}")
             return resp.json()
         except Exception:
@@ -52,7 +98,7 @@ class ServerRequests:
 
     def get_shift_info(self):
         try:
-            resp = requests.get(self.server_url(Config().get_shift_info_url()), headers={'Accept': 'application/json'})
+            resp, _ = self.get(self.server_url(Config().get_shift_info_url()))
             logging.debug(f"Received response on get_shift_info() query: {resp.json()}")
             return resp.json()
         except Exception:
@@ -66,8 +112,9 @@ class ServerRequests:
             res += f'{arg}={args[arg]}'
         return res
 
-    @staticmethod
-    def server_url(path):
+    def server_url(self, path):
+        if self.base_url is not None:
+            return f"{self.base_url}/{path}"
         return f"{Config().adapter()}{Config().server()}:{Config().port()}/{path}"
 
     def get_urls(self) -> list[str]:
@@ -87,7 +134,7 @@ class ServerRequests:
 
     def apply_url(self, path: str):
         try:
-            resp = requests.get(self.server_url(path), headers={'Accept': 'application/json'})
+            resp, _ = self.get(self.server_url(path))
             logging.debug(f"Received response on {path} query: {resp.json()}")
             return resp.json()
         except Exception:
@@ -97,18 +144,40 @@ class ServerRequests:
 class TransferInfo:
     """
     Helper class to handle information about transfer speed
+
+    num_bytes is the size of the (decompressed) body, num_bytes_on_wire what was actually transferred, which is less
+    when the server compresses. time_in_sec is the wall time of the request including reading the body.
     """
 
-    def __init__(self, resp: requests.Response):
-        self.num_bytes = len(resp.text)
-        self.time_in_sec = resp.elapsed.microseconds / 1e6
+    def __init__(self, num_bytes: int, time_in_sec: float, num_bytes_on_wire: int | None = None):
+        self.num_bytes = num_bytes
+        self.num_bytes_on_wire = num_bytes if num_bytes_on_wire is None else num_bytes_on_wire
+        self.time_in_sec = time_in_sec
+
+    @classmethod
+    def from_response(cls, resp: requests.Response, time_in_sec: float, num_bytes: int | None = None):
+        """num_bytes is the size of the decompressed body if it has been streamed, otherwise that of resp.content"""
+        if num_bytes is None:
+            num_bytes = len(resp.content)
+        try:
+            num_bytes_on_wire = resp.raw.tell()  # bytes read from the connection, i.e. before decompression
+        except (AttributeError, OSError):
+            num_bytes_on_wire = int(resp.headers.get('Content-Length', num_bytes))
+        return cls(num_bytes, time_in_sec, num_bytes_on_wire or num_bytes)
+
+    @classmethod
+    def combine(cls, transfer_infos: list, time_in_sec: float):
+        """Total of transfers that ran concurrently during time_in_sec"""
+        return cls(sum(transfer_info.num_bytes for transfer_info in transfer_infos), time_in_sec,
+                   sum(transfer_info.num_bytes_on_wire for transfer_info in transfer_infos))
 
     @property
     def transfer_speed(self):
-        return self.num_bytes / self.time_in_sec
+        return self.num_bytes_on_wire / self.time_in_sec
 
     def __repr__(self):
-        return (f"{self.format_prefixed(self.num_bytes)}B in {self.format_prefixed(self.time_in_sec)}s "
+        compressed = f" ({self.format_prefixed(self.num_bytes_on_wire)}B compressed)" if self.num_bytes_on_wire != self.num_bytes else ""
+        return (f"{self.format_prefixed(self.num_bytes)}B{compressed} in {self.format_prefixed(self.time_in_sec)}s "
                 f"({self.format_prefixed(self.transfer_speed)}B/s)")
 
     def format_prefixed(self, value) -> str:
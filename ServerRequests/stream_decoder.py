@@ -0,0 +1,171 @@
+import codecs
+import json
+import numpy as np
+
+"""
+Streaming decoder for get_data responses
+
+The response is a JSON object whose values are arrays of numbers (or null), such as the columns of a data store, or
+other JSON values such as the units object. The decoder is fed the body chunk by chunk and parses every array
+straight into a float64 column buffer (null becomes NaN), so the full response text and the nested Python lists are
+never built. Only the not yet parsed tail of the last chunk is kept as text.
+"""
+
+
+class ColumnBuffer:
+    """Growing float64 column; the capacity doubles when needed and is trimmed at the end"""
+
+    def __init__(self, capacity: int = 1024):
+        self.buffer = np.empty(max(capacity, 1))
+        self.size = 0
+
+    def extend(self, values: np.ndarray):
+        needed = self.size + len(values)
+        if needed > len(self.buffer):
+            self.buffer.resize(max(needed, 2 * len(self.buffer)), refcheck=False)
+        self.buffer[self.size:needed] = values
+        self.size = needed
+
+    def finish(self) -> np.ndarray:
+        self.buffer.resize(self.size, refcheck=False)
+        return self.buffer
+
+
+class JsonColumnDecoder:
+
+    c_WHITESPACE = ' \t\r\n'
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.text = ''  # not yet parsed text
+        self.state = 'start'
+        self.key: str | None = None
+        self.column: ColumnBuffer | None = None
+        self.columns: dict[str, np.ndarray | object] = {}
+        self.expected_length = 1024  # the columns of a response have equal lengths, preallocate after the first one
+        self.num_bytes = 0
+
+    def feed(self, chunk: bytes):
+        self.num_bytes += len(chunk)
+        self.text += self.decoder.decode(chunk)
+        self.parse()
+
+    def result(self) -> dict[str, np.ndarray | object]:
+        if self.state != 'end':
+            raise ValueError("Incomplete JSON response")
+        return self.columns
+
+    def parse(self):
+        text = self.text
+        pos = 0
+        while True:
+            while pos < len(text) and text[pos] in self.c_WHITESPACE:
+                pos += 1
+            if pos >= len(text):
+                break
+            if self.state == 'start':
+                self.expect(text, pos, '{')
+                self.state = 'key'
+                pos += 1
+            elif self.state == 'key':
+                if text[pos] == '}':
+                    self.state = 'end'
+                    pos += 1
+                elif text[pos] == ',':
+                    pos += 1
+                else:
+                    self.expect(text, pos, '"')
+                    if (end := text.find('"', pos + 1)) < 0:
+                        break
+                    self.key = json.loads(text[pos:end + 1])
+                    self.state = 'colon'
+                    pos = end + 1
+            elif self.state == 'colon':
+                self.expect(text, pos, ':')
+                self.state = 'value'
+                pos += 1
+            elif self.state == 'value':
+                if text[pos] == '[':
+                    self.column = ColumnBuffer(self.expected_length)
+                    self.state = 'array'
+                    pos += 1
+                else:
+                    try:
+                        value, end = self.json_decoder.raw_decode(text, pos)
+                    except json.JSONDecodeError:
+                        break  # wait for more text
+                    if end == len(text) and not isinstance(value, (dict, list, str)):
+                        break  # a number may continue in the next chunk
+                    self.columns[self.key] = value
+                    self.state = 'key'
+                    pos = end
+            elif self.state == 'array':
+                if (end := text.find(']', pos)) >= 0:
+                    self.append_numbers(text[pos:end])
+                    self.columns[self.key] = self.column.finish()
+                    self.expected_length = len(self.columns[self.key])
+                    self.column = None
+                    self.state = 'key'
+                    pos = end + 1
+                elif (cut := text.rfind(',', pos)) >= 0:
+                    self.append_numbers(text[pos:cut])
+                    pos = cut + 1
+                else:
+                    break
+            else:
+                raise ValueError(f"Unexpected '{text[pos]}' after end of JSON response")
+        self.text = text[pos:]
+
+    def append_numbers(self, text: str):
+        if text.strip():
+            values = np.fromstring(text.replace('null', 'nan'), dtype=np.float64, sep=',')
+            if len(values) != text.count(',') + 1:
+                raise ValueError(f"Array '{self.key}' contains other values than numbers")
+            self.column.extend(values)
+
+    @staticmethod
+    def expect(text: str, pos: int, char: str):
+        if text[pos] != char:
+            raise ValueError(f"Expected '{char}' in JSON response, got '{text[pos]}'")
+
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    n_samples = 1_000_000
+    rng = np.random.default_rng(0)
+    timestamps = (1.7e9 + 10.0 * np.arange(n_samples)).tolist()
+    body = json.dumps({
+        "timestamp": timestamps,
+        "CURRENT_USAGE": [None if i % 1000 == 0 else round(v, 3) for i, v in enumerate(rng.uniform(0, 5, n_samples))],
+        "CURRENT_PRODUCTION": np.round(rng.uniform(0, 3, n_samples), 3).tolist(),
+        "SOLAR": np.round(rng.uniform(0, 3000, n_samples), 1).tolist(),
+        "units": {"CURRENT_USAGE": "kW", "CURRENT_PRODUCTION": "kW", "SOLAR": "W"}
+    }).encode()
+    del timestamps
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = body.decode()  # resp.text
+    data = json.loads(text)  # resp.json()
+    columns = {key: np.array(value, dtype=np.float64) for key, value in data.items() if key != "units"}  # set_data
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    del text, data, columns
+    tracemalloc.stop()
+    print(f"json.loads : {len(body) / 1e6:.1f} MB response, peak {peak / 1e6:.1f} MB, {elapsed:.2f} s")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    decoder = JsonColumnDecoder()
+    for pos in range(0, len(body), 1 << 16):
+        decoder.feed(body[pos:pos + (1 << 16)])
+    columns = decoder.result()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"streaming  : {len(body) / 1e6:.1f} MB response, peak {peak / 1e6:.1f} MB, {elapsed:.2f} s "
+          f"(columns themselves {sum(c.nbytes for c in columns.values() if isinstance(c, np.ndarray)) / 1e6:.1f} MB)")
+    assert np.array_equal(columns["SOLAR"], json.loads(body)["SOLAR"])
@@ -0,0 +1,210 @@
+import gzip
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from Utils.config import Config
+from Utils.columnar_format import c_MIME_TYPE, encode_columns
+
+"""
+Stub of the RAPI server, for trying out ServerRequests without a P1 meter.
+
+Serves the data_stores, data_store_info, get_data and shift_info endpoints (paths as in config.ini) with synthetic
+10-second data. get_data honours the since= argument. New samples are added with StubServer.advance(). A latency
+(in seconds) is added to every request to mimic a slow connection, extra_stores adds more (small) data stores.
+get_data answers in the binary columnar format when the client accepts it, unless binary is False.
+
+Run as module (python -m ServerRequests.stub_server) to serve, or to demonstrate/benchmark delta fetches, data store
+discovery and the local data cache against it.
+"""
+
+
+class StubServer:
+
+    c_SAMPLING_TIME = 10.0
+
+    def __init__(self, n_samples: int = 8640, start_timestamp: float = 1.7e9, port: int = 0, latency: float = 0.0,
+                 extra_stores: int = 0, binary: bool = True):
+        self.stores = {
+            "P1": {"Db": "stub", "Signals": ["CURRENT_USAGE", "CURRENT_PRODUCTION", "SOLAR"],
+                   "units": {"CURRENT_USAGE": "kW", "CURRENT_PRODUCTION": "kW", "SOLAR": "W"}},
+            "gas_hourly": {"Db": "stub", "Signals": ["USAGE_GAS"], "units": {"USAGE_GAS": "m3/h"}},
+        }
+        for i in range(extra_stores):
+            self.stores[f"store_{i}"] = {"Db": "stub", "Signals": ["TEMPERATURE"], "units": {"TEMPERATURE": "C"}}
+        self.latency = latency
+        self.binary = binary
+        self.start_timestamp = start_timestamp
+        self.n_samples = n_samples
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("localhost", port), self.handler_class())
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def advance(self, n_samples: int):
+        with self.lock:
+            self.n_samples += n_samples
+
+    def timestamps(self, since: float | None) -> list[float]:
+        with self.lock:
+            n_samples = self.n_samples
+        first = 0 if since is None else max(0, math.floor((since - self.start_timestamp) / self.c_SAMPLING_TIME) + 1)
+        return [self.start_timestamp + i * self.c_SAMPLING_TIME for i in range(first, n_samples)]
+
+    @staticmethod
+    def value(signal: str, timestamp: float) -> float | None:
+        if int(timestamp) % 997 == 0:
+            return None  # af en toe een ontbrekend sample
+        phase = (timestamp % 86400) / 86400 * 2 * math.pi
+        return round(abs(math.sin(phase + len(signal))) * (1000.0 if signal == "SOLAR" else 1.0), 3)
+
+    def get_data(self, args: dict[str, str]) -> dict:
+        store = self.stores[args["data_store_name"]]
+        timestamps = self.timestamps(float(args["since"]) if "since" in args else None)
+        signals = [signal for signal in args.get("signals", "").split(",") if signal in store["Signals"]]
+        data = {"timestamp": timestamps}
+        for signal in signals:
+            data[signal] = [self.value(signal, timestamp) for timestamp in timestamps]
+        data["units"] = {signal: store["units"][signal] for signal in signals}
+        return data
+
+    def respond(self, path: str, args: dict[str, str], query: str):
+        if path == Config().get_data_stores_url():
+            return {"data_stores": list(self.stores)}
+        elif path == Config().get_data_store_info_url(query).split("?")[0]:
+            return {"Name": query, "Db": self.stores[query]["Db"], "Signals": self.stores[query]["Signals"]}
+        elif path == Config().get_data_url():
+            return self.get_data(args)
+        elif path == Config().get_shift_info_url():
+            return {"shift": 0.0}
+
+    def handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                time.sleep(stub.latency)
+                parts = urlsplit(self.path)
+                args = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                try:
+                    result = stub.respond(parts.path.strip("/"), args, parts.query)
+                except KeyError:
+                    result = None
+                if result is None:
+                    self.send_error(404)
+                    return
+                if stub.binary and c_MIME_TYPE in self.headers.get("Accept", "") and "timestamp" in result:
+                    columns = {key: value for key, value in result.items() if key != "units"}
+                    columns["timestamp"] = np.array(columns["timestamp"], dtype=np.int64)
+                    self.send_body(encode_columns(columns, {"units": result["units"]}), c_MIME_TYPE)
+                else:
+                    self.send_body(json.dumps(result).encode(), "application/json")
+
+            def send_body(self, body: bytes, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+    from Models.data_store import DataStore
+    from Models.model import Model
+    from ServerRequests.server_requests import ServerRequests
+
+    parser = argparse.ArgumentParser(description="Stub RAPI server")
+    parser.add_argument("action", choices=["serve", "delta", "discovery", "formats", "cache"])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--stores", type=int, default=0, help="number of extra data stores")
+    parser.add_argument("--days", type=float, default=30.0, help="history of the data stores in days")
+    parser.add_argument("--json", action="store_true", help="answer get_data in json only")
+    arguments = parser.parse_args()
+
+    stub = StubServer(n_samples=int(arguments.days * 8640), port=arguments.port, latency=arguments.latency,
+                      extra_stores=arguments.stores, binary=not arguments.json).start()
+    server_requests = ServerRequests(base_url=stub.url)
+    if arguments.action == "serve":
+        print(f"Serving {list(stub.stores)} on {stub.url}")
+        stub.thread.join()
+    elif arguments.action == "delta":
+        data_store = DataStore(name="P1", database="stub", signals=stub.stores["P1"]["Signals"])
+        data, transfer_info = server_requests.get_data(data_store)
+        data_store.set_data(data)
+        print(f"full fetch: {len(data_store.get_time_signal())} samples, {transfer_info}")
+        stub.advance(6)
+        data, transfer_info = server_requests.get_data(data_store, since=data_store.end_timestamp)
+        assert data_store.append_data(data)
+        print(f"delta fetch: {len(data['timestamp'])} new samples, now {len(data_store.get_time_signal())}, {transfer_info}")
+        full = DataStore(name="P1", database="stub", signals=data_store.signals)
+        full.set_data(server_requests.get_data(full)[0])
+        assert all((full.data[k].data == data_store.data[k].data)[full.data[k].valid].all() for k in full.data)
+    elif arguments.action == "formats":
+        data_store = DataStore(name="P1", database="stub", signals=stub.stores["P1"]["Signals"])
+        results = {}
+        for binary in [False, True]:
+            stub.binary = binary
+            data, transfer_info = server_requests.get_data(data_store)
+            results[binary] = data
+            print(f"{'binary' if binary else 'json  '}: {transfer_info}")
+        assert all(np.array_equal(results[False][key], results[True][key], equal_nan=True) for key in results[False] if key != "units")
+        assert results[False]["units"] == results[True]["units"]
+    elif arguments.action == "cache":
+        import tempfile
+        from Models.data_cache import DataCache
+        cache = DataCache(path=tempfile.mkdtemp(), max_size=1 << 30)
+        for run in ["cold start", "warm start", "warm start"]:
+            stub.advance(6 if run != "cold start" else 0)
+            start = time.perf_counter()
+            data_store = DataStore(name="P1", database="stub", signals=stub.stores["P1"]["Signals"])
+            if cached_data := cache.load(stub.url, data_store):
+                data_store.set_data(cached_data)
+                data, transfer_info = server_requests.get_data(data_store, since=data_store.end_timestamp)
+                assert data_store.append_data(data)
+            else:
+                data, transfer_info = server_requests.get_data(data_store)
+                data_store.set_data(data)
+            cache.store(stub.url, data_store)
+            print(f"{run}: {len(data_store.get_time_signal())} samples in {1000 * (time.perf_counter() - start):.0f} ms, {transfer_info}")
+        full = DataStore(name="P1", database="stub", signals=data_store.signals)
+        full.set_data(server_requests.get_data(full)[0])
+        cached = DataStore(name="P1", database="stub", signals=data_store.signals)
+        cached.set_data(cache.load(stub.url, cached))
+        assert all(np.array_equal(full.data[k].data, cached.data[k].data, equal_nan=True) and full.data[k].unit == cached.data[k].unit
+                   for k in full.data)
+        cache.max_size = 0
+        cache.evict()
+        assert cache.load(stub.url, cached) is None
+    elif arguments.action == "discovery":
+        for max_workers in [1, 4, 8, 16]:
+            start = time.perf_counter()
+            infos = Model.discover_data_stores(server_requests, max_workers)
+            print(f"{len(infos)} data stores, {arguments.latency * 1000:.0f} ms latency, max_workers {max_workers}: "
+                  f"{1000 * (time.perf_counter() - start):.0f} ms")
+    stub.stop()
@@ -0,0 +1,85 @@
+import io
+import json
+import struct
+import numpy as np
+
+"""
+Binary columnar format
+
+    magic       8 bytes  b"PVCOLS01"
+    length      uint64, little-endian: length of the header
+    header      JSON: {"meta": {...}, "columns": [{"name": .., "dtype": "<f8" | "<i8", "offset": .., "length": ..}]}
+    padding     up to a multiple of c_ALIGNMENT
+    data        the column blocks, little-endian; offsets are relative to the start of the data and aligned
+
+The meta object is free format, e.g. the units of the signals. Decoding maps the blocks with numpy.frombuffer without
+copying (the arrays are read-only views on the buffer).
+"""
+
+c_MIME_TYPE = "application/x-powerviewer-columns"
+c_MAGIC = b"PVCOLS01"
+c_ALIGNMENT = 64
+c_DTYPES = {np.dtype("<f8"), np.dtype("<i8")}
+
+
+def aligned(n: int) -> int:
+    return -(-n // c_ALIGNMENT) * c_ALIGNMENT
+
+
+def write_columns(file, columns: dict[str, np.ndarray], meta: dict | None = None):
+    arrays = {}
+    for name, column in columns.items():
+        array = np.asarray(column)
+        dtype = np.dtype("<i8") if np.issubdtype(array.dtype, np.integer) else np.dtype("<f8")
+        arrays[name] = np.ascontiguousarray(array, dtype=dtype)
+    specs = []
+    offset = 0
+    for name, array in arrays.items():
+        specs.append({"name": name, "dtype": array.dtype.str, "offset": offset, "length": len(array)})
+        offset = aligned(offset + array.nbytes)
+    header = json.dumps({"meta": meta or {}, "columns": specs}).encode()
+    file.write(c_MAGIC + struct.pack("<Q", len(header)) + header)
+    file.write(bytes(data_start(len(header)) - len(c_MAGIC) - 8 - len(header)))
+    position = 0
+    for spec, array in zip(specs, arrays.values()):
+        file.write(bytes(spec["offset"] - position))
+        file.write(array.data)
+        position = spec["offset"] + array.nbytes
+
+
+def encode_columns(columns: dict[str, np.ndarray], meta: dict | None = None) -> bytes:
+    buffer = io.BytesIO()
+    write_columns(buffer, columns, meta)
+    return buffer.getvalue()
+
+
+def data_start(header_length: int) -> int:
+    return aligned(len(c_MAGIC) + 8 + header_length)
+
+
+def read_header(buffer) -> tuple[dict, int]:
+    """Returns the header and the offset of the data section"""
+    if bytes(buffer[:len(c_MAGIC)]) != c_MAGIC:
+        raise ValueError("Not a columnar file")
+    header_length, = struct.unpack("<Q", bytes(buffer[len(c_MAGIC):len(c_MAGIC) + 8]))
+    header = json.loads(bytes(buffer[len(c_MAGIC) + 8:len(c_MAGIC) + 8 + header_length]))
+    for spec in header["columns"]:
+        if np.dtype(spec["dtype"]) not in c_DTYPES:
+            raise ValueError(f"Unsupported dtype {spec['dtype']} of column {spec['name']}")
+    return header, data_start(header_length)
+
+
+def decode_columns(buffer) -> tuple[dict[str, np.ndarray], dict]:
+    header, start = read_header(buffer)
+    columns = {spec["name"]: np.frombuffer(buffer, dtype=spec["dtype"], count=spec["length"], offset=start + spec["offset"])
+               for spec in header["columns"]}
+    return columns, header["meta"]
+
+
+if __name__ == "__main__":
+    columns = {"timestamp": 1_700_000_000 + 10 * np.arange(5), "SOLAR": np.array([1.5, np.nan, 3.0, 0.0, -2.25])}
+    encoded = encode_columns(columns, {"units": {"SOLAR": "W"}})
+    decoded, meta = decode_columns(encoded)
+    assert np.array_equal(decoded["timestamp"], columns["timestamp"]) and decoded["timestamp"].dtype == np.int64
+    assert np.array_equal(decoded["SOLAR"], columns["SOLAR"], equal_nan=True) and meta == {"units": {"SOLAR": "W"}}
+    print(f"{len(encoded)} bytes: {decoded}, {meta}")
@@ -1,5 +1,6 @@
 import os
 import configparser
+from Algorithms.gap_fill import GapFill
 
 
 class Config:
@@ -33,6 +34,36 @@ class Config:
     def get_shift_info_url(self):
         return self.config.get('CONNECTION', 'get_shift_info_url')
 
+    def get_connect_timeout(self) -> float:
+        return float(self.config.get('CONNECTION', 'connect_timeout', fallback='5'))
+
+    def get_read_timeout(self) -> float:
+        return float(self.config.get('CONNECTION', 'read_timeout', fallback='60'))
+
+    def get_retries(self) -> int:
+        return int(self.config.get('CONNECTION', 'retries', fallback='3'))
+
+    def get_pool_size(self) -> int:
+        return int(self.config.get('CONNECTION', 'pool_size', fallback='10'))
+
+    def get_binary_transfer(self) -> bool:
+        return True if self.config.get('CONNECTION', 'binary_transfer', fallback='ON') == "ON" else False
+
+    def get_max_concurrency(self) -> int:
+        return int(self.config.get('CONNECTION', 'max_concurrency', fallback='8'))
+
+    def get_cache_max_size(self) -> int:
+        """Maximale omvang van de lokale data-cache in bytes"""
+        return int(float(self.config.get('CACHE', 'max_size_mb', fallback='500')) * 1024 * 1024)
+
+    def get_copy_background_cells(self) -> int:
+        """Aantal cellen vanaf waar een kopie van de tabelselectie op de achtergrond wordt gemaakt"""
+        return int(self.config.get('TABLE', 'copy_background_cells', fallback='200000'))
+
+    def get_copy_file_cells(self) -> int:
+        """Aantal cellen vanaf waar de tabelselectie als CSV-bestand in plaats van als tekst wordt gekopieerd"""
+        return int(self.config.get('TABLE', 'copy_file_cells', fallback='5000000'))
+
     def getUiDirName(self):
         return self.config.get('PATHS', 'ui')
 
@@ -88,6 +119,12 @@ class Config:
     def getCrossCorrKernelSize(self):
         return int(self.config.get('ALGORITHM', 'crosscorr_kernel_size'))
 
+    def get_gap_fill_mode(self) -> GapFill:
+        return GapFill(self.config.get('ALGORITHM', 'gap_fill', fallback=GapFill.LINEAR.value))
+
+    def get_gap_fill_hold_edges(self) -> bool:
+        return self.config.getboolean('ALGORITHM', 'gap_fill_hold_edges', fallback=False)
+
     def get_initial_plot_time_range_hours(self):
         return float(self.config.get('PLOTTING', 'initial_plot_time_range_hours'))
 
@@ -40,7 +40,7 @@ class UnitStandardizer:
     def convert(self, signal: Signal, unit: str):
         conv_fac, conv_unit = self.get_conversion_factor(unit)
         signal.unit = conv_unit
-        signal.data = [item * conv_fac if item is not None else 0.0 for item in signal]
+        signal.data = signal.data * conv_fac  # ontbrekende samples (NaN) blijven ontbrekend
 
     def get_conversion_factor(self, unit):
         for unit_type in self.c_UNITS.values():
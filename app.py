@@ -1,5 +1,6 @@
 import sys
 import os
+import argparse
 import logging
 from logging.handlers import RotatingFileHandler
 from GUI.Tools.time_format import logging_fmt
@@ -11,9 +12,12 @@ from GUI.gui_controller import GUIController
 class Application:
 
     def __init__(self):
-        app = QApplication(sys.argv)
+        parser = argparse.ArgumentParser(description=Config().getAppName())
+        parser.add_argument('--no-cache', action='store_true', help='data niet uit de lokale cache lezen of erin bewaren')
+        arguments, qt_arguments = parser.parse_known_args()  # de overige argumenten zijn voor Qt
+        app = QApplication(sys.argv[:1] + qt_arguments)
         initializeLogging(Config().getLoggingPath())
-        contr = GUIController()
+        contr = GUIController(use_cache=not arguments.no_cache)
         sys.exit(app.exec())
 
 